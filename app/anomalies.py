@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from datastore import COUNT_COLUMNS
+from incremental import Incremental
+
+# Weeks after which an observation weighs half as much in its weekday's baseline
+HALFLIFE_WEEKS = 8
+# |z| above which a day is flagged
+THRESHOLD = 3.0
+# Observations of a weekday before its days can be flagged
+WARMUP_WEEKS = 4
+
+
+class SeasonalDetector:
+    # Exponentially weighted mean and variance of every metric for each day of the week.
+    # The state is a few (7, metrics) arrays whatever the history length, and each new day
+    # costs one update of its weekday's row. A day is scored against the baseline before it,
+    # and deviations beyond the threshold are clipped before they update the baseline, so a
+    # single spike does not hide the days after it.
+
+    def __init__(self, metrics=COUNT_COLUMNS, halflife: float = HALFLIFE_WEEKS, threshold: float = THRESHOLD,
+                 warmup: int = WARMUP_WEEKS):
+        self.metrics = list(metrics)
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.threshold = threshold
+        self.warmup = warmup
+        self.mean = np.zeros((7, len(self.metrics)))
+        self.var = np.zeros((7, len(self.metrics)))
+        self.seen = np.zeros(7, dtype=np.int64)
+
+    def copy(self) -> 'SeasonalDetector':
+        detector = object.__new__(SeasonalDetector)
+        detector.__dict__.update(self.__dict__)
+        detector.mean, detector.var, detector.seen = self.mean.copy(), self.var.copy(), self.seen.copy()
+        return detector
+
+    def _step(self, slots: np.ndarray, values: np.ndarray) -> tuple:
+        # One observation for each of `slots` (distinct weekdays); returns (expected, z) before the update
+        seen = self.seen[slots][:, None]
+        mean = np.where(seen == 0, values, self.mean[slots])
+        var = self.var[slots]
+        diff = values - mean
+        std = np.sqrt(var)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(seen >= self.warmup, diff / std, np.nan)
+        limit = self.threshold * std
+        diff = np.where(seen >= self.warmup, np.clip(diff, -limit, limit), diff)
+        step = self.alpha * diff
+        self.mean[slots] = mean + step
+        self.var[slots] = (1 - self.alpha) * (var + diff * step)
+        self.seen[slots] += 1
+        return mean, z
+
+    def update(self, weekday: int, values) -> tuple:
+        # Online update with one day of every metric: O(1) time and memory
+        expected, z = self._step(np.array([weekday]), np.asarray(values, dtype=np.float64)[None, :])
+        return expected[0], z[0]
+
+    def backfill(self, weekdays, values) -> tuple:
+        # (expected, z) arrays (n, metrics) for rows in date order, continuing from the current state.
+        # The k-th remaining day of every weekday is processed together, so a year of history is
+        # about 52 vectorized steps and gives the same values as calling update() row by row.
+        weekdays = np.asarray(weekdays, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        n = len(weekdays)
+        expected = np.empty((n, len(self.metrics)))
+        z = np.empty((n, len(self.metrics)))
+        if not n:
+            return expected, z
+        by_day = np.argsort(weekdays, kind='stable')
+        starts = np.searchsorted(weekdays[by_day], np.arange(7))
+        rank = np.empty(n, dtype=np.int64)
+        rank[by_day] = np.arange(n) - starts[weekdays[by_day]]
+        order = np.argsort(rank, kind='stable')
+        bounds = np.searchsorted(rank[order], np.arange(rank.max() + 2))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            rows = order[lo:hi]
+            expected[rows], z[rows] = self._step(weekdays[rows], values[rows])
+        return expected, z
+
+
+class AnomalyTrack(Incremental):
+    # Baseline and z-score of every metric on every day, computed once per data version.
+    # New days continue the detector state online instead of replaying the history.
+
+    def __init__(self, data: pd.DataFrame, metrics=COUNT_COLUMNS):
+        self.detector = SeasonalDetector(metrics)
+        self.index = pd.DatetimeIndex(data.index)
+        self.expected, self.z = self.detector.backfill(data['Day'].cat.codes.to_numpy(),
+                                                       data[self.detector.metrics].to_numpy())
+
+    def _extend(self, data: pd.DataFrame, n: int) -> dict:
+        # Each new day is one online update of a copy of the detector
+        detector = self.detector.copy()
+        weekdays = data['Day'].cat.codes.to_numpy()[n:]
+        values = data[detector.metrics].to_numpy()[n:]
+        steps = [detector.update(weekday, row) for weekday, row in zip(weekdays, values)]
+        return {
+            'detector': detector,
+            'expected': np.concatenate([self.expected] + [expected[None, :] for expected, _ in steps]),
+            'z': np.concatenate([self.z] + [z[None, :] for _, z in steps])
+        }
+
+    def flagged(self, data: pd.DataFrame, threshold: float = THRESHOLD, metrics=None) -> pd.DataFrame:
+        # Flagged days of a date range of the tracked data, one row per day and metric:
+        # Date, Metric, Value, Expected, Z
+        metrics = list(metrics or self.detector.metrics)
+        lo = self.index.searchsorted(data.index[0], side='left')
+        hi = self.index.searchsorted(data.index[-1], side='right')
+        columns = [self.detector.metrics.index(metric) for metric in metrics]
+        z = self.z[lo:hi, columns]
+        rows, cols = np.nonzero(np.abs(np.nan_to_num(z)) > threshold)
+        return pd.DataFrame({
+            'Date': self.index[lo:hi][rows],
+            'Metric': np.array(metrics)[cols],
+            'Value': data[metrics].to_numpy()[rows, cols],
+            'Expected': self.expected[lo:hi, columns][rows, cols],
+            'Z': z[rows, cols]
+        })
@@ -0,0 +1,130 @@
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from datastore import DAYS_ORDER
+from executor import ForecastExecutor
+from fast_forecast import rolling_forecasts
+from forecasting import DEFAULT_ORDER, REFIT_EVERY, ForecastState, fit_arima, series_fingerprint
+from shared_cache import cache_key
+
+# Days of history before the first origin (less for short ranges, see origins())
+MIN_TRAIN = 365
+# Days between two consecutive origins
+ORIGIN_STEP = 7
+
+
+def origins(n: int, horizon: int, step: int = ORIGIN_STEP, min_train: int = MIN_TRAIN) -> np.ndarray:
+    # Positions where a forecast starts: the model sees rows [0, origin) and is scored on the next `horizon`
+    min_train = min(min_train, n // 2)
+    return np.arange(min_train, n - horizon + 1, step)
+
+
+def backtest_fold(ts: pd.Series, positions, horizon: int, engine: str = 'arima', order=DEFAULT_ORDER,
+                  refit_every: int = REFIT_EVERY) -> np.ndarray:
+    # (len(positions), horizon) forecasts from consecutive origins. ARIMA is fitted at the first
+    # origin only; later origins filter the new days into that state, with a full refit every
+    # `refit_every` days like the live forecasts. The NumPy engines carry their state through the
+    # series in one pass, with the same forecasts as a refit at every origin.
+    warnings.filterwarnings('ignore')
+    if engine != 'arima':
+        return rolling_forecasts(ts.to_numpy(dtype=np.float64), positions, horizon, engine)
+    forecasts = []
+    state = None
+    for origin in positions:
+        history = ts.iloc[:origin]
+        if state is None:
+            state = ForecastState(fit_arima(history, order), history, order)
+        else:
+            state = state.extend(history, refit_every)
+        forecasts.append(state.forecast(horizon))
+    return np.array(forecasts)
+
+
+def score(ts: pd.Series, positions, forecasts: np.ndarray) -> dict:
+    # MAE and MAPE (%) per horizon step and per day of the week of the forecast day
+    horizon = forecasts.shape[1]
+    values = ts.to_numpy(dtype=np.float64)
+    targets = positions[:, None] + np.arange(horizon)
+    errors = np.abs(forecasts - values[targets])
+    pct = errors / np.maximum(np.abs(values[targets]), 1) * 100
+    weekdays = ts.index.dayofweek.to_numpy()[targets].ravel()
+    by_weekday = pd.DataFrame({'MAE': errors.ravel(), 'MAPE': pct.ravel()}).groupby(weekdays).mean()
+    return {
+        'horizon': pd.DataFrame({'MAE': errors.mean(axis=0), 'MAPE': pct.mean(axis=0)}, index=np.arange(1, horizon + 1)),
+        'weekday': by_weekday.set_axis([DAYS_ORDER[day] for day in by_weekday.index]).reindex(DAYS_ORDER),
+        'origins': len(positions),
+        'mae': float(errors.mean()),
+        'mape': float(pct.mean())
+    }
+
+
+class Backtester:
+    # Rolling-origin backtests of one series and model. ARIMA origins are split into contiguous
+    # folds, one per worker, so each process fits once and carries its state forward through its
+    # fold; the NumPy engines take milliseconds for all origins and run in this process.
+    # Results are memoized per (series, data fingerprint, model, order, horizon, step), and in
+    # the `shared` cache when given, so one process runs a backtest while the others wait for it.
+
+    def __init__(self, executor: ForecastExecutor, maxsize: int = 32, shared=None):
+        self.executor = executor
+        self.maxsize = maxsize
+        self.shared = shared
+        self.runs = 0
+        self.hits = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self, name: str, ts: pd.Series, horizon: int = 30, engine: str = 'arima', order=DEFAULT_ORDER,
+            step: int = ORIGIN_STEP) -> dict:
+        # None when the series is too short for a single origin, or a fold timed out or its worker died
+        order = tuple(order) if engine == 'arima' else None
+        key = (name, series_fingerprint(ts), engine, order, horizon, step)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+        if self.shared is not None:
+            result = self.shared.get_or_compute(cache_key('backtest', *key), lambda: self._run(ts, horizon, engine, order, step))
+        else:
+            result = self._run(ts, horizon, engine, order, step)
+        if result is None:
+            return None
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    def _run(self, ts: pd.Series, horizon: int, engine: str, order, step: int) -> dict:
+        positions = origins(len(ts), horizon, step)
+        if not len(positions):
+            return None
+        began = time.perf_counter()
+        if engine != 'arima':
+            return self._scored(ts, positions, backtest_fold(ts, positions, horizon, engine), began)
+        folds = [fold for fold in np.array_split(positions, self.executor.max_workers) if len(fold)]
+        futures = [self.executor.submit(backtest_fold, ts, fold, horizon, engine, order)
+                   for fold in folds]
+        try:
+            forecasts = np.concatenate([self.executor.result(future) for future in futures])
+        except (FutureTimeoutError, BrokenProcessPool):
+            for future in futures:
+                future.cancel()
+            return None
+        return self._scored(ts, positions, forecasts, began)
+
+    def _scored(self, ts: pd.Series, positions, forecasts: np.ndarray, began: float) -> dict:
+        result = score(ts, positions, forecasts)
+        result['seconds'] = time.perf_counter() - began
+        with self._lock:
+            self.runs += 1
+        return result
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def _fft_length(n: int) -> int:
+    # Zero-padding to at least 2n - 1 avoids circular wrap-around in the correlation
+    return 1 << (2 * n - 1).bit_length()
+
+
+def acf_fft(values, nlags: int) -> np.ndarray:
+    # Autocorrelations of every row of `values` (series x time) for lags 0..nlags in one FFT pass.
+    # Uses the biased (1/n) autocovariance, like statsmodels' acf(adjusted=False).
+    x = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    n = x.shape[-1]
+    nlags = min(nlags, n - 1)
+    x = x - x.mean(axis=-1, keepdims=True)
+    spectrum = np.fft.rfft(x, n=_fft_length(n), axis=-1)
+    acov = np.fft.irfft(spectrum * np.conj(spectrum), axis=-1)[:, :nlags + 1] / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return acov / acov[:, :1]
+
+
+def pacf_durbin_levinson(acf) -> np.ndarray:
+    # Partial autocorrelations from autocorrelations (series x lags), vectorized across series.
+    # Matches statsmodels' pacf(method='ywm') when given the biased ACF.
+    acf = np.atleast_2d(np.asarray(acf, dtype=np.float64))
+    # A constant series has no defined autocorrelation (0/0); like statsmodels, its PACF is 0
+    acf = np.where(np.isfinite(acf), acf, 0.0)
+    k, nlags = acf.shape[0], acf.shape[1] - 1
+    pacf = np.ones((k, nlags + 1))
+    if nlags == 0:
+        return pacf
+    phi = np.zeros((k, nlags + 1))
+    phi[:, 1] = acf[:, 1]
+    pacf[:, 1] = acf[:, 1]
+    sigma = 1 - acf[:, 1] ** 2
+    for m in range(2, nlags + 1):
+        # phi[:, 1:m] holds the order m-1 AR coefficients
+        reflection = (acf[:, m] - np.einsum('ij,ij->i', phi[:, 1:m], acf[:, m - 1:0:-1])) / sigma
+        phi[:, 1:m] = phi[:, 1:m] - reflection[:, None] * phi[:, m - 1:0:-1]
+        phi[:, m] = reflection
+        pacf[:, m] = reflection
+        sigma = sigma * (1 - reflection ** 2)
+    return pacf
+
+
+def correlogram(values, nlags: int) -> tuple:
+    # (acf, pacf) arrays shaped (series, nlags + 1)
+    acf = acf_fft(values, nlags)
+    return acf, pacf_durbin_levinson(acf)
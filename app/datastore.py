@@ -0,0 +1,350 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dataset')
+DATASET_PATH = os.path.join(DATASET_DIR, 'daily-website-visitors.csv')
+STORE_DIR = os.path.join(DATASET_DIR, '.store')
+
+COUNT_COLUMNS = ['Page_Loads', 'Unique_Visits', 'First_Time_Visits', 'Returning_Visits']
+# Column order and on-disk dtype of every column kept in the store
+STORE_DTYPES = {
+    'Row': 'int64',
+    'Day': 'U9',
+    'Day_Of_Week': 'int64',
+    'Date': 'datetime64[ns]',
+    'Page_Loads': 'int64',
+    'Unique_Visits': 'int64',
+    'First_Time_Visits': 'int64',
+    'Returning_Visits': 'int64'
+}
+# Categories of the compact multi-site frame, in Day_Of_Week order (Sunday is 1) and calendar order
+DAY_NAMES = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+# Monday to Sunday, the order of every per-weekday table and figure
+DAYS_ORDER = DAY_NAMES[1:] + DAY_NAMES[:1]
+MANIFEST_NAME = 'manifest.json'
+# File in a source's store directory naming its current version directory
+CURRENT_NAME = 'current'
+# Seconds a replaced version is kept for readers that resolved it just before the switch
+RETIRED_SECONDS = 3600
+STORE_VERSION = 1
+# Rows parsed per chunk; peak ingestion memory is bounded by this, not by the file size
+CHUNK_ROWS = 100_000
+# Daily exports carry dates only; hourly ones add the time of day. A file may mix both.
+DATE_FORMAT = '%m/%d/%Y'
+DATETIME_FORMAT = '%m/%d/%Y %H:%M'
+
+
+def iter_csv_chunks(path: str, chunksize: int = CHUNK_ROWS):
+    # The parser strips the thousands separators ("2,146") itself, so counts arrive as integers
+    reader = pd.read_csv(
+        path,
+        chunksize=chunksize,
+        thousands=',',
+        dtype={'Row': 'int64', 'Day': str, 'Day.Of.Week': 'int64', 'Date': str,
+               'Page.Loads': 'int64', 'Unique.Visits': 'int64',
+               'First.Time.Visits': 'int64', 'Returning.Visits': 'int64'}
+    )
+    for chunk in reader:
+        # A header-only file (e.g. a feed with no new days) has nothing to parse
+        if chunk.empty:
+            continue
+        chunk.columns = [col.replace('.', '_') for col in chunk.columns]
+        chunk['Date'] = _parse_dates(chunk['Date'])
+        yield chunk
+
+
+def _parse_dates(dates: pd.Series) -> np.ndarray:
+    # Each row is parsed with the format of its own layout, so a file can mix dates and date-times.
+    # Most chunks have a single layout, tried first from the first row.
+    present = dates.dropna()
+    if len(present):
+        try:
+            return pd.to_datetime(dates, format=DATETIME_FORMAT if ' ' in present.iloc[0] else DATE_FORMAT).to_numpy()
+        except ValueError:
+            pass
+    timed = dates.str.contains(' ', regex=False).fillna(False).to_numpy(dtype=bool)
+    parsed = np.full(len(dates), np.datetime64('NaT'), dtype='datetime64[ns]')
+    for date_format, rows in ((DATE_FORMAT, ~timed), (DATETIME_FORMAT, timed)):
+        if rows.any():
+            parsed[rows] = pd.to_datetime(dates[rows], format=date_format, errors='coerce').to_numpy()
+    invalid = np.isnat(parsed) & dates.notna().to_numpy()
+    if invalid.any():
+        raise ValueError(f"Unrecognized date {dates[invalid].iloc[0]!r} in the Date column; "
+                         f"expected month/day/year, optionally followed by hours:minutes")
+    return parsed
+
+
+class _ColumnWriter:
+    # Appends raw column values chunk by chunk and wraps them in a .npy header at the end
+
+    def __init__(self, path: str, dtype: str):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        self._raw = open(path + '.raw', 'wb')
+
+    def append(self, values):
+        array = np.ascontiguousarray(values, dtype=self.dtype)
+        self._raw.write(array.tobytes())
+        self.rows += len(array)
+
+    def close(self):
+        self._raw.close()
+        header = {'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False, 'shape': (self.rows,)}
+        with open(self.path, 'wb') as out, open(self.path + '.raw', 'rb') as raw:
+            np.lib.format.write_array_header_1_0(out, header)
+            shutil.copyfileobj(raw, out, 1 << 20)
+        os.remove(self.path + '.raw')
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _store_path(source: str, store_dir: str) -> str:
+    # One sub-directory per source file so several datasets can share a store. The hash of the
+    # absolute path keeps exports with the same file name in different directories apart.
+    key = hashlib.sha1(os.path.abspath(source).encode()).hexdigest()[:8]
+    return os.path.join(store_dir, f'{site_name(source)}-{key}')
+
+
+def _write_atomic(path: str, text: str):
+    # Readers see the old file or the new one; the scratch name is unique to the writer
+    tmp_name = f'{path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    with open(tmp_name, 'w') as fh:
+        fh.write(text)
+    os.replace(tmp_name, path)
+
+
+def _read_manifest(path: str):
+    try:
+        with open(os.path.join(path, MANIFEST_NAME)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _current_version(path: str):
+    # Directory of the version the store's pointer names, or None before the first build
+    try:
+        with open(os.path.join(path, CURRENT_NAME)) as fh:
+            return os.path.join(path, fh.read().strip())
+    except OSError:
+        return None
+
+
+def _is_fresh(manifest, source: str, path: str) -> bool:
+    if manifest is None or manifest.get('version') != STORE_VERSION:
+        return False
+    stat = os.stat(source)
+    if manifest['mtime_ns'] == stat.st_mtime_ns and manifest['size'] == stat.st_size:
+        return True
+    # The mtime moved (checkout, copy, touch): only rebuild if the content changed
+    if manifest['size'] != stat.st_size or manifest['sha256'] != _file_digest(source):
+        return False
+    manifest['mtime_ns'] = stat.st_mtime_ns
+    _write_manifest(path, manifest)
+    return True
+
+
+def _write_manifest(path: str, manifest: dict):
+    _write_atomic(os.path.join(path, MANIFEST_NAME), json.dumps(manifest, indent=2))
+
+
+def _write_version(tmp_path: str, source: str, stat, sha256: str, chunksize: int):
+    writers = {col: _ColumnWriter(os.path.join(tmp_path, col + '.npy'), dtype) for col, dtype in STORE_DTYPES.items()}
+    for chunk in iter_csv_chunks(source, chunksize=chunksize):
+        for col, writer in writers.items():
+            writer.append(chunk[col].to_numpy())
+    for writer in writers.values():
+        writer.close()
+    _write_manifest(tmp_path, {
+        'version': STORE_VERSION,
+        'source': os.path.basename(source),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': sha256,
+        'rows': writers['Row'].rows,
+        'columns': list(STORE_DTYPES)
+    })
+
+
+def _remove_retired(path: str, current: str):
+    # Versions replaced more than RETIRED_SECONDS ago, and scratch directories of builds that died
+    cutoff = time.time() - RETIRED_SECONDS
+    for entry in os.scandir(path):
+        if entry.is_dir() and entry.path != current and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def build_store(source: str = DATASET_PATH, store_dir: str = STORE_DIR, chunksize: int = CHUNK_ROWS) -> str:
+    # Builds the store of `source` and makes it current; safe to run from several processes at once.
+    # Each version lives in a directory named by the source hash and is never modified once in place,
+    # so a reader holding an older version keeps reading it while the pointer moves on.
+    path = _store_path(source, store_dir)
+    os.makedirs(path, exist_ok=True)
+    stat = os.stat(source)
+    sha256 = _file_digest(source)
+    version = os.path.join(path, sha256[:16])
+    if _read_manifest(version) is None:
+        tmp_path = os.path.join(path, f'.tmp-{os.getpid()}-{threading.get_ident()}')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        _write_version(tmp_path, source, stat, sha256, chunksize)
+        try:
+            os.rename(tmp_path, version)
+        except OSError:
+            # Another process put the same version in place first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+    previous = _current_version(path)
+    _write_atomic(os.path.join(path, CURRENT_NAME), os.path.basename(version))
+    if previous is not None and previous != version and os.path.isdir(previous):
+        # Its age now counts from the moment it stopped being current
+        os.utime(previous)
+    _remove_retired(path, version)
+    return version
+
+
+def open_store(path: str) -> pd.DataFrame:
+    # Memory-map every column; nothing is parsed on a warm start
+    columns = {col: np.load(os.path.join(path, col + '.npy'), mmap_mode='r') for col in STORE_DTYPES}
+    df = pd.DataFrame(columns, copy=False)
+    df['Day'] = df['Day'].astype(object)
+    return df
+
+
+def select_date_range(data: pd.DataFrame, start_date, end_date) -> pd.DataFrame:
+    # Positional slice of the sorted index: no boolean masks, no copy of the rows
+    lo = data.index.searchsorted(pd.Timestamp(start_date), side='left')
+    hi = data.index.searchsorted(pd.Timestamp(end_date), side='right')
+    return data.iloc[lo:hi]
+
+
+def load_store(source: str = DATASET_PATH, store_dir: str = STORE_DIR, chunksize: int = CHUNK_ROWS) -> pd.DataFrame:
+    version = _current_version(_store_path(source, store_dir))
+    if version is None or not _is_fresh(_read_manifest(version), source, version):
+        version = build_store(source, store_dir, chunksize)
+    return open_store(version)
+
+
+def site_name(source: str) -> str:
+    return os.path.splitext(os.path.basename(source))[0]
+
+
+def site_names(sources) -> list:
+    # Site of each source, named after its file; exports sharing a file name keep their directory
+    names = [site_name(source) for source in sources]
+    return [f'{os.path.basename(os.path.dirname(os.path.abspath(source)))}/{name}' if names.count(name) > 1 else name
+            for source, name in zip(sources, names)]
+
+
+def _calendar_columns(days: np.ndarray) -> dict:
+    # Day, Day_Of_Week and Month derived from int days since 1970-01-01 (a Thursday)
+    weekday = (days + 4) % 7
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) % 12
+    return {
+        'Day': pd.Categorical.from_codes(weekday.astype(np.int8), DAY_NAMES),
+        'Day_Of_Week': (weekday + 1).astype(np.int8),
+        'Month': pd.Categorical.from_codes(months.astype(np.int8), MONTH_NAMES)
+    }
+
+
+def compact_frame(sites: dict) -> pd.DataFrame:
+    # {site: store frame} -> one frame of every site: Site/Day/Month categoricals, int8 weekday,
+    # int32 days since the epoch and int32 counts. Row and the per-row day strings are dropped.
+    names = list(sites)
+    dates = [df['Date'].to_numpy() for df in sites.values()]
+    for name, values in zip(names, dates):
+        if (values != values.astype('datetime64[D]')).any():
+            raise ValueError(f'{name}: the compact frame holds daily data, found times of day')
+    days = np.concatenate(dates).astype('datetime64[D]').astype(np.int32)
+    return pd.DataFrame({
+        'Site': pd.Categorical.from_codes(np.repeat(np.arange(len(names), dtype=np.int16), [len(df) for df in sites.values()]), names),
+        'Date': days,
+        **_calendar_columns(days),
+        **{col: np.concatenate([df[col].to_numpy() for df in sites.values()]).astype(np.int32) for col in COUNT_COLUMNS}
+    })
+
+
+def load_sites(sources, store_dir: str = STORE_DIR) -> pd.DataFrame:
+    # Compact frame of several exports; each site is named after its file
+    return compact_frame({name: load_store(source, store_dir) for source, name in zip(sources, site_names(sources))})
+
+
+def frame_digest(data: pd.DataFrame) -> str:
+    # Identifies the content of a calendar frame (its dates and counts), the same in every process
+    digest = hashlib.sha1(np.ascontiguousarray(data.index.asi8).tobytes())
+    for col in COUNT_COLUMNS:
+        digest.update(np.ascontiguousarray(data[col].to_numpy(dtype=np.int64)).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _read_only(values):
+    values = np.asarray(values)
+    values.flags.writeable = False
+    return values
+
+
+def calendar_frame(days: np.ndarray, counts: dict, base: pd.DataFrame = None) -> pd.DataFrame:
+    # Date-indexed frame the panels read, built once per data version: counts, Day/Month
+    # categoricals whose codes give the weekday (Sunday is 0) and month (January is 0), and the
+    # dates, sorted. Every array is read-only, so writing to its values raises. The frame object
+    # itself can still gain or replace columns; callers that share it get copy(deep=False).
+    # With `base`, the days continue that frame and only their calendar fields are computed.
+    if len(days) and (np.diff(days) < 0).any():
+        order = np.argsort(days, kind='mergesort')
+        days, counts = days[order], {col: values[order] for col, values in counts.items()}
+    calendar = _calendar_columns(days)
+    new = {
+        'Day': calendar['Day'].codes,
+        'Day_Of_Week': calendar['Day_Of_Week'],
+        'Date': days.astype('datetime64[D]').astype('datetime64[ns]'),
+        'Month': calendar['Month'].codes,
+        **counts
+    }
+    if base is not None:
+        old = {col: base[col].cat.codes if col in ('Day', 'Month') else base[col] for col in new}
+        new = {col: np.concatenate([old[col].to_numpy(), values]) for col, values in new.items()}
+    columns = {col: _read_only(values) for col, values in new.items()}
+    columns['Day'] = pd.Categorical.from_codes(columns['Day'], DAY_NAMES)
+    columns['Month'] = pd.Categorical.from_codes(columns['Month'], MONTH_NAMES)
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(columns['Date']), copy=False)
+
+
+def append_sites(frame: pd.DataFrame, appended) -> pd.DataFrame:
+    # Compact frame with (site, store-layout rows) pairs of known sites added at the end, in one copy
+    categories = frame['Site'].cat.categories
+    added = []
+    for site, rows in appended:
+        days = rows['Date'].to_numpy().astype('datetime64[D]').astype(np.int32)
+        added.append(pd.DataFrame({
+            'Site': pd.Categorical.from_codes(np.full(len(rows), categories.get_loc(site), dtype=np.int16), categories),
+            'Date': days,
+            **_calendar_columns(days),
+            **{col: rows[col].to_numpy().astype(np.int32) for col in COUNT_COLUMNS}
+        }))
+    return pd.concat([frame] + added, ignore_index=True)
+
+
+def site_view(frame: pd.DataFrame, site: str = None) -> pd.DataFrame:
+    # Calendar frame of one site, or of the per-day total of every site when site is None.
+    # Totals are one grouped sum over all sites, not a loop per site.
+    if site is None and len(frame['Site'].cat.categories) == 1:
+        site = frame['Site'].cat.categories[0]
+    if site is not None:
+        rows = frame[frame['Site'].cat.codes.to_numpy() == frame['Site'].cat.categories.get_loc(site)]
+        return calendar_frame(rows['Date'].to_numpy(), {col: rows[col].to_numpy() for col in COUNT_COLUMNS})
+    totals = frame.groupby('Date', sort=True)[COUNT_COLUMNS].sum()
+    return calendar_frame(totals.index.to_numpy(), {col: totals[col].to_numpy() for col in COUNT_COLUMNS})
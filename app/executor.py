@@ -0,0 +1,176 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import warnings
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+import preload
+from forecasting import DEFAULT_ORDER, ForecastModelCache, ForecastState, fit_arima
+
+# Seconds from submitting a fit until it is given up on
+JOB_TIMEOUT = 120
+# Seconds past its deadline a job is waited for before its pool is killed; a worker normally
+# stops the job itself at the deadline, unless it is stuck in native code meanwhile
+KILL_GRACE = 5
+
+
+class _DeadlinePassed(BaseException):
+    # Raised inside a worker at the job's deadline; a BaseException so the fitting code's own
+    # `except Exception` blocks cannot swallow it
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _DeadlinePassed()
+
+
+def _run_until(deadline: float, fn, *args):
+    # Runs in a worker process: fn(*args), stopped by a timer at `deadline` (wall-clock time, the
+    # same in every process). The worker survives, so other jobs on the pool are unaffected.
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise TimeoutError('deadline passed before the job started')
+    previous = signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        return fn(*args)
+    except _DeadlinePassed:
+        raise TimeoutError('deadline passed while the job was running') from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def fit_state_job(ts: pd.Series, order=DEFAULT_ORDER) -> ForecastState:
+    # Runs in a worker process; the fitted state is pickled back to the caller
+    warnings.filterwarnings('ignore')
+    return ForecastState(fit_arima(ts, order), ts, order)
+
+
+def _resolved(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class ForecastExecutor:
+    # Fits independent series (and orders) at the same time on a process pool.
+    # The pool is started lazily and reused for the life of the process. A job that outlives
+    # its deadline is stopped by its own worker, which then takes the next job. Only a job that
+    # ignores the timer for KILL_GRACE seconds more gets its pool replaced and its workers killed;
+    # jobs that failed only because of that are submitted again while their deadline allows.
+
+    def __init__(self, max_workers: int = None, timeout: float = JOB_TIMEOUT):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        # Jobs submitted to the pool and results that were given up on
+        self.jobs = 0
+        self.timeouts = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # The workers are forked, so a background import must not be half done meanwhile
+                preload.wait()
+                # Streamlit installs the running script as __main__, and spawn/forkserver workers
+                # would re-execute it on start-up; fork the workers instead where the OS allows it
+                methods = multiprocessing.get_all_start_methods()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('fork' if 'fork' in methods else None)
+                )
+            return self._pool
+
+    def _count(self, name: str):
+        # Jobs are submitted and collected from several session and fragment threads
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def submit(self, fn, *args, deadline: float = None) -> Future:
+        # The timeout runs from here, not from whenever the result is asked for
+        self._count('jobs')
+        deadline = deadline or time.time() + self.timeout
+        pool = self.pool
+        try:
+            future = pool.submit(_run_until, deadline, fn, *args)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool and try once more
+            self._retire(pool)
+            pool = self.pool
+            future = pool.submit(_run_until, deadline, fn, *args)
+        future.deadline, future.pool, future.job, future.callbacks = deadline, pool, (fn, args), []
+        return future
+
+    @staticmethod
+    def on_result(future: Future, callback):
+        # callback(result) once the job succeeds, also when it had to be submitted again
+        future.callbacks.append(callback)
+        future.add_done_callback(lambda f: not f.cancelled() and f.exception() is None and callback(f.result()))
+
+    def fit_states(self, cache: ForecastModelCache, jobs, live: bool = False) -> dict:
+        # jobs: iterable of (name, series, order). Returns {(name, order): Future[ForecastState]}.
+        # Cached states (and, for live data, cheaply extendable ones) resolve immediately; the
+        # rest are fitted in parallel.
+        futures = {}
+        for name, ts, order in jobs:
+            order = tuple(order)
+            state = cache.lookup(name, ts, order, live)
+            if state is not None:
+                futures[(name, order)] = _resolved(state)
+                continue
+            future = self.submit(fit_state_job, ts, order)
+            self.on_result(future, lambda state, name=name, ts=ts: cache.store(name, ts, state))
+            futures[(name, order)] = future
+        return futures
+
+    def result(self, future: Future):
+        # Raises concurrent.futures.TimeoutError when the job is not done by its deadline, and
+        # BrokenProcessPool when its worker died and there is no time left to run it again
+        deadline = getattr(future, 'deadline', None)
+        timeout = self.timeout if deadline is None else max(deadline - time.time(), 0) + KILL_GRACE
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            self._count('timeouts')
+            if not future.cancel() and future.running() and hasattr(future, 'pool'):
+                # Still running well past the deadline: only killing its worker frees it
+                self._retire(future.pool, kill=True)
+            raise
+        except BrokenProcessPool:
+            self._retire(getattr(future, 'pool', None))
+            if deadline is None or deadline <= time.time():
+                raise
+        # Its pool was broken by another job's worker; run it again on a fresh pool
+        fn, args = future.job
+        retry = self.submit(fn, *args, deadline=deadline)
+        for callback in future.callbacks:
+            self.on_result(retry, callback)
+        return self.result(retry)
+
+    def _retire(self, pool: ProcessPoolExecutor, kill: bool = False):
+        # Stops handing out `pool`. Killing its workers fails the jobs still running on it
+        # with BrokenProcessPool; queued ones fail the same way instead of waiting forever.
+        if pool is None:
+            return
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        if kill:
+            # ProcessPoolExecutor has no public way to stop a running job
+            for process in list((getattr(pool, '_processes', None) or {}).values()):
+                process.terminate()
+        pool.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+
+# Forecast engines that fit a whole matrix of series (one per column) at once in NumPy.
+# They cost milliseconds where an ARIMA fit costs a likelihood optimization per series,
+# so they are the path for forecasting every metric of many sites.
+
+SEASON = 7
+# Smoothing parameters (alpha, beta, gamma) tried for every series at once; each series keeps
+# the combination with the smallest one-step-ahead squared error
+HW_GRID = [(a, b, g) for a in (0.1, 0.3, 0.5) for b in (0.0, 0.02) for g in (0.05, 0.2, 0.4)]
+# Lags of the autoregression on daily differences; two weeks cover the weekly pattern
+AR_LAGS = 14
+# Engines offered by the dashboard and report; 'arima' is the statsmodels path in forecasting.py
+ENGINE_LABELS = {
+    'arima': 'ARIMA',
+    'holt_winters': 'Holt-Winters',
+    'ar': 'Least-squares AR',
+    'seasonal_naive': 'Seasonal naive'
+}
+
+
+def _matrix(values) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    return values[:, None] if values.ndim == 1 else values
+
+
+def seasonal_naive(values, steps: int, season: int = SEASON) -> np.ndarray:
+    # Every series repeats its last week
+    last = _matrix(values)[-season:]
+    return last[np.arange(steps) % len(last)]
+
+
+def _smooth(values: np.ndarray, stops, season: int = SEASON, grid=HW_GRID):
+    # Additive Holt-Winters; every grid combination of every series is smoothed in the same pass.
+    # Yields (level, trend, seasonal, sse) after the first `stop` rows, for each of the ascending
+    # `stops` (all at least 2 * season), so one pass serves forecasts from many origins.
+    n, k = values.shape
+    params = np.asarray(grid, dtype=np.float64)
+    alpha, beta, gamma = (params[:, i, None] for i in range(3))
+    first = values[:season].mean(axis=0)
+    level = np.repeat(first[None, :], len(params), axis=0)
+    trend = np.zeros_like(level)
+    seasonal = np.repeat((values[:season] - first)[:, None, :], len(params), axis=1)
+    sse = np.zeros_like(level)
+    stops = iter(stops)
+    stop = next(stops, None)
+    for t in range(season, n):
+        if stop is None:
+            return
+        s = seasonal[t % season]
+        sse += (values[t] - level - trend - s) ** 2
+        new_level = alpha * (values[t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal[t % season] = gamma * (values[t] - new_level) + (1 - gamma) * s
+        level = new_level
+        while stop == t + 1:
+            yield level, trend, seasonal.copy(), sse.copy()
+            stop = next(stops, None)
+
+
+def _hw_forecast(state, n: int, steps: int, season: int = SEASON) -> np.ndarray:
+    # (steps, k) forecasts after n rows, each series with the combination of smallest error
+    level, trend, seasonal, sse = state
+    best, cols = sse.argmin(axis=0), np.arange(sse.shape[1])
+    h = np.arange(1, steps + 1)
+    return level[best, cols] + h[:, None] * trend[best, cols] + seasonal[(n - 1 + h) % season][:, best, cols]
+
+
+def holt_winters(values, steps: int, season: int = SEASON, grid=HW_GRID) -> np.ndarray:
+    # Each series keeps the grid combination that fitted its own history best
+    values = _matrix(values)
+    n = len(values)
+    if n < 2 * season:
+        return seasonal_naive(values, steps, season)
+    return _hw_forecast(next(_smooth(values, [n], season, grid)), n, steps, season)
+
+
+def ar_least_squares(values, steps: int, lags: int = AR_LAGS) -> np.ndarray:
+    # AR(lags) on first differences, like ARIMA(lags, 1, 0) estimated by conditional least
+    # squares; the normal equations of all series are built and solved as one batch
+    values = _matrix(values)
+    diffs = np.diff(values, axis=0)
+    if len(diffs) <= 2 * lags:
+        return seasonal_naive(values, steps)
+    # Column i of the design holds the differences i rows before the target (oldest lag first).
+    # Each cross-product is one column-wise dot over shifted views, so no (rows, k, lags) copy is made.
+    rows, k = len(diffs) - lags, values.shape[1]
+    shifted = [diffs[i:i + rows] for i in range(lags + 1)]
+    xtx = np.empty((k, lags, lags))
+    xty = np.empty((k, lags))
+    for i in range(lags):
+        xty[:, i] = np.einsum('tk,tk->k', shifted[i], shifted[lags])
+        for j in range(i, lags):
+            xtx[:, i, j] = xtx[:, j, i] = np.einsum('tk,tk->k', shifted[i], shifted[j])
+    phi = _ridge_solve(xtx, xty)
+    return _ar_forecast(diffs[-lags:].T, values[-1], phi, steps)
+
+
+def _ridge_solve(xtx: np.ndarray, xty: np.ndarray) -> np.ndarray:
+    # A tiny ridge keeps flat series solvable
+    lags = xtx.shape[-1]
+    ridge = 1e-9 * np.maximum(np.trace(xtx, axis1=1, axis2=2) / lags, 1.0)
+    return np.linalg.solve(xtx + ridge[:, None, None] * np.eye(lags), xty[..., None])[..., 0]
+
+
+def _ar_forecast(window: np.ndarray, level: np.ndarray, phi: np.ndarray, steps: int) -> np.ndarray:
+    # (steps, k) levels from the last `lags` differences (k, lags) and last values (k,) of each series
+    window = window.copy()
+    level = level.copy()
+    out = np.empty((steps, len(level)))
+    for h in range(steps):
+        step = (window * phi).sum(axis=1)
+        level += step
+        out[h] = level
+        window = np.concatenate([window[:, 1:], step[:, None]], axis=1)
+    return out
+
+
+ENGINES = {'holt_winters': holt_winters, 'ar': ar_least_squares, 'seasonal_naive': seasonal_naive}
+
+
+def _rolling_seasonal_naive(values: np.ndarray, positions: np.ndarray, steps: int, season: int = SEASON) -> np.ndarray:
+    return values[positions[:, None] - season + np.arange(steps) % season]
+
+
+def _rolling_holt_winters(values: np.ndarray, positions: np.ndarray, steps: int, season: int = SEASON) -> np.ndarray:
+    states = _smooth(values[:, None], positions, season)
+    return np.array([_hw_forecast(state, origin, steps, season)[:, 0] for state, origin in zip(states, positions)])
+
+
+def _rolling_ar(values: np.ndarray, positions: np.ndarray, steps: int, lags: int = AR_LAGS) -> np.ndarray:
+    # The cross-products of the design grow by the rows between two origins; all origins' normal
+    # equations are then solved as one batch and their forecasts run side by side
+    diffs = np.diff(values)
+    design = np.lib.stride_tricks.sliding_window_view(diffs, lags + 1)
+    rows = positions - 1 - lags
+    products = np.empty((len(positions), lags + 1, lags + 1))
+    total, done = np.zeros((lags + 1, lags + 1)), 0
+    for i, end in enumerate(rows):
+        total += design[done:end].T @ design[done:end]
+        products[i], done = total, end
+    phi = _ridge_solve(products[:, :lags, :lags], products[:, :lags, lags])
+    windows = diffs[rows[:, None] + np.arange(lags)]
+    return _ar_forecast(windows, values[positions - 1], phi, steps).T
+
+
+# Smallest origin each rolling engine handles itself; earlier origins are fitted on their own
+ROLLING = {
+    'holt_winters': (_rolling_holt_winters, 2 * SEASON),
+    'ar': (_rolling_ar, 2 * AR_LAGS + 2),
+    'seasonal_naive': (_rolling_seasonal_naive, SEASON)
+}
+
+
+def rolling_forecasts(values, positions, steps: int, engine: str = 'holt_winters') -> np.ndarray:
+    # (len(positions), steps) forecasts of one series from ascending origins, each seeing only
+    # values[:origin]. The engine's state is updated from one origin to the next in a single pass
+    # rather than refitted on every prefix; the forecasts are the same as those refits.
+    values = np.asarray(values, dtype=np.float64)
+    positions = np.asarray(positions, dtype=np.int64)
+    rolling, minimum = ROLLING[engine]
+    short = positions < minimum
+    out = np.empty((len(positions), steps))
+    for i in np.flatnonzero(short):
+        out[i] = ENGINES[engine](values[:positions[i]], steps)[:, 0]
+    if not short.all():
+        out[~short] = rolling(values, positions[~short], steps)
+    return out
+
+
+def weekday_profile(forecasts, last_date) -> np.ndarray:
+    # (7, k) mean forecast per day of the week, Monday to Sunday (0 where the horizon has none);
+    # the same values average_by_weekday gives for each column
+    forecasts = _matrix(forecasts)
+    weekday = (pd.Timestamp(last_date).dayofweek + 1 + np.arange(len(forecasts))) % 7
+    counts = np.bincount(weekday, minlength=7)
+    sums = np.zeros((7, forecasts.shape[1]))
+    np.add.at(sums, weekday, forecasts)
+    return np.divide(sums, counts[:, None], out=np.zeros_like(sums), where=counts[:, None] > 0)
+
+
+def forecast_matrix(values, steps: int, engine: str = 'holt_winters') -> np.ndarray:
+    # (steps, k) forecasts of the columns of `values` (rows are consecutive days)
+    return ENGINES[engine](values, steps)
@@ -0,0 +1,185 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from datastore import DAYS_ORDER
+from shared_cache import cache_key
+
+DEFAULT_ORDER = (5, 1, 0)
+# Full refit after this many rows were appended with filter-only updates
+REFIT_EVERY = 30
+# Kinds of cached state: estimated on exactly its data, or carried forward with filter-only updates
+FITTED = 'fitted'
+UPDATED = 'updated'
+
+
+def _digest(values) -> str:
+    values = np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+    return hashlib.sha1(values.tobytes()).hexdigest()[:16]
+
+
+def series_fingerprint(ts: pd.Series) -> tuple:
+    # Identifies the data a model was fitted on: its date range plus a digest of the values
+    return (str(ts.index[0].date()), str(ts.index[-1].date()), len(ts), _digest(ts.to_numpy()))
+
+
+def split_order(order) -> tuple:
+    # Orders are (p, d, q), or (p, d, q, P, D, Q, s) when they carry a seasonal part
+    order = tuple(order)
+    return order[:3], (order[3:] or (0, 0, 0, 0))
+
+
+def fit_arima(ts: pd.Series, order=DEFAULT_ORDER, maxiter: int = None):
+    # statsmodels takes longer to import than the rest of the app; it loads with the first fit
+    from statsmodels.tsa.arima.model import ARIMA
+
+    order, seasonal_order = split_order(order)
+    method_kwargs = {'maxiter': maxiter} if maxiter else None
+    return ARIMA(ts, order=order, seasonal_order=seasonal_order).fit(method_kwargs=method_kwargs)
+
+
+def average_by_weekday(values, last_date) -> list:
+    # Mean forecast per day of the week, Monday to Sunday
+    forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=len(values))
+    avg_by_day = pd.Series(np.asarray(values), index=forecast_dates.day_name()).groupby(level=0).mean()
+    return avg_by_day.reindex(DAYS_ORDER).fillna(0).values.tolist()
+
+
+class ForecastState:
+    # A fitted model plus what it was fitted on, so later rows can be filtered in
+    # with the same parameters instead of re-estimating them from scratch
+
+    def __init__(self, fit, ts: pd.Series, order, appended: int = 0):
+        self.fit = fit
+        self.order = tuple(order)
+        self.fingerprint = series_fingerprint(ts)
+        self.start = ts.index[0]
+        self.end = ts.index[-1]
+        self.nobs = len(ts)
+        # Rows added since the parameters were last estimated
+        self.appended = appended
+
+    def can_extend(self, ts: pd.Series) -> bool:
+        if len(ts) <= self.nobs or ts.index[0] != self.start or ts.index[self.nobs - 1] != self.end:
+            return False
+        # The fitted history must be an unchanged prefix of the new series
+        return _digest(ts.to_numpy()[:self.nobs]) == self.fingerprint[3]
+
+    def refit_due(self, ts: pd.Series, refit_every: int = REFIT_EVERY) -> bool:
+        # Whether extending to `ts` re-estimates the parameters instead of only filtering
+        return bool(refit_every) and self.appended + len(ts) - self.nobs >= refit_every
+
+    def extend(self, ts: pd.Series, refit_every: int = REFIT_EVERY) -> 'ForecastState':
+        new_rows = ts.iloc[self.nobs:]
+        if self.refit_due(ts, refit_every):
+            return ForecastState(fit_arima(ts, self.order), ts, self.order)
+        # Filter-only update: same parameters, state carried through the new observations
+        fit = self.fit.append(new_rows, refit=False)
+        return ForecastState(fit, ts, self.order, self.appended + len(new_rows))
+
+    def forecast(self, steps: int) -> np.ndarray:
+        return np.asarray(self.fit.forecast(steps=steps))
+
+
+class ForecastModelCache:
+    # Fitted ARIMA states keyed by (series, data fingerprint, order, kind) with LRU eviction.
+    # The horizon is not part of the key: any number of steps is served from the same fit.
+    # A live lookup (a range that ends at the newest day) may instead extend the newest state
+    # for that series with a filter-only update; every `refit_every` rows it misses instead, so
+    # the full refit is fitted like any other (on the executor's pool, within its deadline).
+    # Those states are kept apart from fresh fits, so any other lookup gets a fit of exactly its
+    # data whatever was computed before. With a `shared` cache, fresh fits made by other
+    # processes are reused before fitting again.
+
+    def __init__(self, maxsize: int = 32, incremental: bool = True, refit_every: int = REFIT_EVERY, shared=None):
+        self.maxsize = maxsize
+        self.incremental = incremental
+        self.refit_every = refit_every
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self._states = OrderedDict()
+        # Latest key per (series, start date, order), the base for incremental updates
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._states)
+
+    def get(self, key):
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+                self.hits += 1
+            return state
+
+    def put(self, key, state: ForecastState):
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            name, _, order, _ = key
+            latest_key = (name, order, state.start)
+            latest = self._states.get(self._latest.get(latest_key))
+            if latest is None or latest.end <= state.end:
+                self._latest[latest_key] = key
+            while len(self._states) > self.maxsize:
+                evicted, old = self._states.popitem(last=False)
+                # Keep the index of newest states as bounded as the states themselves
+                evicted_latest = (evicted[0], evicted[2], old.start)
+                if self._latest.get(evicted_latest) == evicted:
+                    del self._latest[evicted_latest]
+
+    def _base_for(self, name: str, ts: pd.Series, order):
+        with self._lock:
+            base = self._states.get(self._latest.get((name, tuple(order), ts.index[0])))
+        if base is not None and base.can_extend(ts):
+            return base
+        return None
+
+    def lookup(self, name: str, ts: pd.Series, order=DEFAULT_ORDER, live: bool = False):
+        # A fresh fit of exactly this data or, when `live`, a state carried forward to it from an
+        # earlier one; None means a fit is needed
+        fingerprint, order = series_fingerprint(ts), tuple(order)
+        key = (name, fingerprint, order, FITTED)
+        state = self.get(key)
+        if state is None and self.shared is not None:
+            state = self.shared.load(cache_key('forecast', *key))
+            if state is not None:
+                self.put(key, state)
+        if state is not None or not (live and self.incremental):
+            return state
+        updated_key = (name, fingerprint, order, UPDATED)
+        state = self.get(updated_key)
+        if state is not None:
+            return state
+        base = self._base_for(name, ts, order)
+        if base is None or base.refit_due(ts, self.refit_every):
+            return None
+        state = base.extend(ts, self.refit_every)
+        with self._lock:
+            self.updates += 1
+        self.put(updated_key, state)
+        return state
+
+    def _put_fitted(self, key, state: ForecastState):
+        self.put(key, state)
+        if self.shared is not None:
+            self.shared.store(cache_key('forecast', *key), state)
+
+    def store(self, name: str, ts: pd.Series, state: ForecastState):
+        with self._lock:
+            self.misses += 1
+        self._put_fitted((name, series_fingerprint(ts), state.order, FITTED), state)
+
+    def get_state(self, name: str, ts: pd.Series, order=DEFAULT_ORDER, live: bool = False) -> ForecastState:
+        state = self.lookup(name, ts, order, live)
+        if state is None:
+            # Fit outside the lock so other sessions are not blocked meanwhile
+            state = ForecastState(fit_arima(ts, order), ts, order)
+            self.store(name, ts, state)
+        return state
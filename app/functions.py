@@ -1,274 +1,317 @@
+import functools
+import json
+import os
 import pandas as pd
-import plotly.graph_objects as go
-from statsmodels.tsa.stattools import acf, pacf
-import numpy as np
-import plotly.express as px
 import streamlit as st
-from statsmodels.tsa.arima.model import ARIMA
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from datastore import DATASET_PATH, frame_digest, select_date_range
+from forecasting import DEFAULT_ORDER, ForecastModelCache, average_by_weekday
+from executor import JOB_TIMEOUT, ForecastExecutor
+from backtest import Backtester
+from fast_forecast import ENGINE_LABELS
+from order_selection import OrderSelector, candidate_orders
+from instrumentation import REGISTRY, serve_metrics
+from shared_cache import TTL_SECONDS, SharedCache, cache_key
+from table import EXPORTERS, PAGE_SIZES, ExportRegistry, page, serve_exports
+from live import POLL_SECONDS, DropFileFeed, HttpFeed, LiveDataset, LiveWatcher
+from panels import (
+    acf_pacf_figure,
+    anomaly_figure,
+    backtest_figure,
+    boxplot_figure,
+    correlogram_frames,
+    distribution_kde_figure,
+    forecast_figure,
+    heatmap_figure,
+    moving_average_figure,
+    violin_figure,
+    weekday_forecasts
+)
 
-@st.cache_data
-def load_data():
+def instrumented(cache):
+    # Wraps a Streamlit cache decorator to count requests and misses (the body only runs
+    # on a miss) and to time each call, so the debug panel can tell cache hits from work
+    def decorate(func):
+        label = func.__name__
+
+        @cache
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            REGISTRY.count('cache_misses', cache=label)
+            return func(*args, **kwargs)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            REGISTRY.count('cache_requests', cache=label)
+            with REGISTRY.timer(f'load.{label}'):
+                return compute(*args, **kwargs)
+        wrapper.clear = compute.clear
+        return wrapper
+    return decorate
+
+@st.cache_resource
+def load_metrics_server():
+    # Aggregate timings for a local scraper: /metrics (Prometheus text) and /metrics.json
+    port = int(os.environ.get('METRICS_PORT', 0))
+    return serve_metrics(REGISTRY, port) if port else None
+
+# Exports loaded side by side, one site per file (TRAFFIC_SOURCES, separated like PATH)
+SOURCES = [path for path in os.environ.get('TRAFFIC_SOURCES', '').split(os.pathsep) if path] or [DATASET_PATH]
+
+@instrumented(st.cache_resource)
+def load_live():
+    # Every site in one compact frame, parsed once into typed columnar stores and shared by all
+    # sessions. New days appended to the source files (or served by LIVE_FEED_URL) are added to
+    # it in the background, together with the aggregates of the sites they belong to.
+    dataset = LiveDataset(SOURCES)
+    feeds = [DropFileFeed(path, name) for path, name in zip(SOURCES, dataset.names)]
+    if os.environ.get('LIVE_FEED_URL'):
+        feeds += [HttpFeed(os.environ['LIVE_FEED_URL'], name) for name in dataset.names]
+    interval = float(os.environ.get('LIVE_POLL_SECONDS', POLL_SECONDS))
+    if interval > 0:
+        LiveWatcher(dataset, feeds, interval).start()
+    REGISTRY.register('live', lambda: {'version': dataset.version, 'rows_appended': dataset.appended})
+    return dataset
+
+def site_names() -> list:
+    try:
+        return load_live().names
+    except Exception:
+        return []  # load_data reports the error
+
+def load_data(site=None):
     try:
-        dtype_dict = {
-            'Row': int,
-            'Day': str,
-            'Day_Of_Week': int,
-            'Date': str,
-            'Page_Loads': str,
-            'Unique_Visits': str,
-            'First_Time_Visits': str,
-            'Returning_Visits': str
-        }
-        file_url = "https://raw.githubusercontent.com/GabrielPy28/WebTrafficExplorer/refs/heads/main/dataset/daily-website-visitors.csv"
-        df = pd.read_csv(file_url, dtype=dtype_dict)
-        df.columns = [col.replace('.', '_') for col in df.columns]
-        for col in ['Page_Loads', 'Unique_Visits', 'First_Time_Visits', 'Returning_Visits']:
-            df[col] = df[col].str.replace(',', '', regex=False).astype(int)
-        df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%Y')
-        return df
-    except FileNotFoundError:
-        st.error("The file 'daily-website-visitors.csv' was not found.")
+        # Latest data of one site, or the daily total of all sites when site is None. Its arrays
+        # are read-only and shared by every session and rerun (appends replace them with new ones).
+        # Each caller gets its own frame over them, so columns a session adds stay in that session.
+        return load_live().state(site).data.copy(deep=False)
+    except FileNotFoundError as e:
+        st.error(f"The file '{os.path.basename(e.filename or DATASET_PATH)}' was not found.")
         return pd.DataFrame()  # Return an empty DataFrame in case of error
     except Exception as e:
         st.error(f"An error occurred while loading the data: {e}")
         return pd.DataFrame()  # Return an empty DataFrame in case of error
 
-def plot_heatmap(data):
-    # Create columns for month and day of the week
-    data['Month'] = data['Date'].dt.month_name().str.slice(stop=3)  # abbreviation
-    data['Day_Name'] = data['Date'].dt.day_name().str.slice(stop=3)
-    
-    # Create pivot table with average unique visits by day and month
-    pivot_table = data.pivot_table(
-        index='Day_Name',
-        columns='Month',
-        values='Unique_Visits',
-        aggfunc='mean'
-    )
-    
-    # Order days and months to make sense in the heatmap
-    days_order = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    months_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    
-    pivot_table = pivot_table.reindex(index=days_order)
-    pivot_table = pivot_table[months_order]
-    
-    fig = go.Figure(data=go.Heatmap(
-        z=pivot_table.values,
-        x=pivot_table.columns,
-        y=pivot_table.index,
-        colorscale=[[0, '#fcffff'], [0.1, '#bcfdff'], [0.2, '#9ddbf9'], [0.3, '#7bbbf2'], [0.4, '#509beb'], [0.6, '#2b7ed7'], [0.8, '#1f62b7'], [0.9, '#114898'], [1, '#002f7a']],
-        colorbar=dict(title='Unique Visits', bgcolor='rgba(252, 255, 255, 0)', tickcolor='#fdfefe', titlefont=dict(color='#fdfefe'))
-    ))
-    
-    fig.update_layout(
-        title='Heatmap: Unique Visits by Day of the Week and Month',
-        plot_bgcolor='rgba(252, 255, 255, 0)',
-        paper_bgcolor='rgba(252, 255, 255, 0)',
-        xaxis=dict(title='Month', titlefont=dict(color='#fdfefe'), tickfont=dict(color='#fdfefe')),
-        yaxis=dict(title='Day of the Week', titlefont=dict(color='#fdfefe'), tickfont=dict(color='#fdfefe'))
+def load_rollup(site=None):
+    # Calendar prefix sums of the latest data; every date range is answered from them
+    return load_live().state(site).rollup
+
+@instrumented(st.cache_resource)
+def load_shared_cache():
+    # Results shared with the other replicas on this host when SHARED_CACHE_PATH is set (a file on
+    # /dev/shm keeps it in memory); size limit in SHARED_CACHE_MB, lifetime in SHARED_CACHE_TTL seconds
+    path = os.environ.get('SHARED_CACHE_PATH')
+    if not path:
+        return None
+    cache = SharedCache(
+        path,
+        max_bytes=int(float(os.environ.get('SHARED_CACHE_MB', 512)) * 1024 * 1024),
+        ttl=float(os.environ.get('SHARED_CACHE_TTL', TTL_SECONDS))
     )
-    st.plotly_chart(fig, use_container_width=True)
+    REGISTRY.register('shared_cache', cache.stats)
+    return cache
 
-def plot_boxplot(data):
-    # Change category names in the DataFrame
-    df_melt = data.melt(id_vars=['Date'], value_vars=['Unique_Visits', 'First_Time_Visits', 'Returning_Visits'], 
-                        var_name='Visit Type', value_name='Count')
-    
-    # Change category names
-    df_melt['Visit Type'] = df_melt['Visit Type'].replace({
-        'Unique_Visits': 'Unique Visits',
-        'First_Time_Visits': 'New User Visits',
-        'Returning_Visits': 'Returning User Visits'
+def show_figure(build, key):
+    # Plots build(), or the figure JSON another replica already built for the parts key() returns.
+    # The key is only computed with a shared cache, since it hashes the data.
+    shared = load_shared_cache()
+    if shared is None:
+        st.plotly_chart(build(), use_container_width=True)
+        return
+    spec = shared.get_or_compute(cache_key('figure', *key()), lambda: build().to_json(), dumps=str.encode, loads=bytes.decode)
+    st.plotly_chart(json.loads(spec), use_container_width=True)
+
+@instrumented(st.cache_resource)
+def load_model_cache():
+    # Fitted ARIMA models shared by every session and rerun of this process, and with the
+    # other replicas through the shared cache
+    cache = ForecastModelCache(maxsize=32, shared=load_shared_cache())
+    REGISTRY.register('forecast_cache', lambda: {
+        'hits': cache.hits, 'misses': cache.misses, 'updates': cache.updates, 'size': len(cache)
     })
+    return cache
 
-    fig = px.box(
-        df_melt,
-        x='Visit Type',
-        y='Count',
-        color='Visit Type',
-        color_discrete_sequence=['#002f7a', '#509beb', '#1f62b7'],
-        title='Distribution of Unique, First-Time, and Returning Visits'
-    )
-    fig.update_layout(
-        plot_bgcolor='rgba(252, 255, 255, 0)',
-        paper_bgcolor='rgba(252, 255, 255, 0)',
-        font_color='#fdfefe',
-        showlegend=False
+@instrumented(st.cache_resource)
+def load_forecast_executor():
+    # Worker count and per-fit timeout can be tuned per deployment
+    executor = ForecastExecutor(
+        max_workers=int(os.environ.get('FORECAST_WORKERS', 0)) or None,
+        timeout=float(os.environ.get('FORECAST_TIMEOUT', JOB_TIMEOUT))
     )
-    
-    st.plotly_chart(fig, use_container_width=True)
-
-import plotly.subplots as sp
-
-def plot_acf_pacf(data, nlags=30):
-    ts = data.sort_values('Date').set_index('Date')['Unique_Visits']
-    ts = ts.dropna()
-    
-    acf_vals = acf(ts, nlags=nlags, fft=False)
-    pacf_vals = pacf(ts, nlags=nlags, method='ywm')
-    lags = np.arange(len(acf_vals))
-    
-    # Create subplots
-    fig = sp.make_subplots(rows=1, cols=2, subplot_titles=('ACF', 'PACF'))
-    
-    # ACF subplot
-    fig.add_trace(go.Bar(
-        x=lags,
-        y=acf_vals,
-        name=' ',
-        marker_color='#002f7a'
-    ), row=1, col=1)
-    
-    # PACF subplot
-    fig.add_trace(go.Bar(
-        x=lags,
-        y=pacf_vals,
-        name=' ',
-        marker_color='#509beb'
-    ), row=1, col=2)
-    
-    # Layout with two subplots
-    fig.update_layout(
-        title='Autocorrelation Function (ACF) and Partial (PACF)',
-        plot_bgcolor='rgba(252, 255, 255, 0)',
-        paper_bgcolor='rgba(252, 255, 255, 0)',
-        font_color='#fdfefe',
-        showlegend=False,
-        margin=dict(l=70, r=70, t=70, b=50)  # margin to avoid cutting labels
-    )
-    
-    # Adjust axes
-    fig.update_xaxes(title='Lag', title_font=dict(size=14), tickfont=dict(size=12), row=1, col=1)
-    fig.update_yaxes(title='ACF', title_font=dict(size=14), tickfont=dict(size=12), autorange=True, title_standoff=10, ticks='outside', ticklen=5, row=1, col=1)
-    
-    fig.update_xaxes(title='Lag', title_font=dict(size=14), tickfont=dict(size=12), row=1, col=2)
-    fig.update_yaxes(title='PACF', title_font=dict(size=14), tickfont=dict(size=12), autorange=True, title_standoff=10, ticks='outside', ticklen=5, row=1, col=2)
-    
-    st.plotly_chart(fig, use_container_width=True)
+    REGISTRY.register('forecast_executor', lambda: {'jobs': executor.jobs, 'timeouts': executor.timeouts})
+    return executor
+
+@instrumented(st.cache_resource)
+def load_order_selector():
+    # Winning orders are memoized per series and date range for the life of the process
+    selector = OrderSelector(load_forecast_executor())
+    REGISTRY.register('order_selector', lambda: {'searches': selector.searches, 'hits': selector.hits})
+    return selector
+
+@REGISTRY.timed('select_orders')
+def select_orders(data: pd.DataFrame, series_list, criterion='aic', seasonal=False):
+    selector = load_order_selector()
+    grid = candidate_orders(seasonal=seasonal)
+    return {col: selector.best_order(col, data[col].dropna(), grid, criterion) for col in series_list}
+
+@instrumented(st.cache_resource)
+def load_backtester():
+    # Backtest results are memoized per series, date range, model and horizon for the life of the
+    # process; with a shared cache each backtest runs in one replica only
+    backtester = Backtester(load_forecast_executor(), shared=load_shared_cache())
+    REGISTRY.register('backtester', lambda: {'runs': backtester.runs, 'hits': backtester.hits})
+    return backtester
+
+@REGISTRY.timed('prefetch_forecasts')
+def prefetch_forecasts(data: pd.DataFrame, series_list, orders=None, site=None):
+    # Start every fit in the background, at its order in `orders` (default otherwise); the radar
+    # chart collects the results later. Only a range that ends at the site's newest day follows
+    # live appends with filter-only updates.
+    orders = orders or {}
+    jobs = [(col, data[col].dropna(), tuple(orders.get(col, DEFAULT_ORDER))) for col in series_list]
+    live = len(data) > 0 and data.index[-1] == load_live().state(site).data.index[-1]
+    return load_forecast_executor().fit_states(load_model_cache(), jobs, live)
+
+def load_rolling(site=None):
+    # 7/28/90-day rolling statistics of every metric, shared by all panels and cards
+    return load_live().state(site).rolling
 
+@st.cache_resource
+def load_export_server():
+    # Exports streamed straight from the shared frame, started with the first table shown.
+    # It listens on EXPORT_PORT, or on a free port when unset; links use EXPORT_HOST
+    registry = ExportRegistry()
+    server = serve_exports(registry, int(os.environ.get('EXPORT_PORT', 0)), os.environ.get('EXPORT_BIND', '127.0.0.1'))
+    return registry, f"http://{os.environ.get('EXPORT_HOST', 'localhost')}:{server.server_address[1]}"
+
+@instrumented(st.cache_data)
+def load_correlogram(start_date, end_date, nlags=30, site=None):
+    # ACF and PACF of all four metrics for a date range, computed as one batch
+    return correlogram_frames(select_date_range(load_data(site), start_date, end_date), nlags)
+
+@REGISTRY.timed('panel.heatmap')
+def plot_heatmap(data, site=None):
+    st.plotly_chart(heatmap_figure(data, load_rollup(site)), use_container_width=True)
+
+@REGISTRY.timed('panel.boxplot')
+def plot_boxplot(data):
+    show_figure(lambda: boxplot_figure(data), lambda: ('boxplot', frame_digest(data)))
+
+@REGISTRY.timed('panel.acf_pacf')
+def plot_acf_pacf(data, nlags=30, site=None):
+    # One FFT pass per date range, shared by every metric and cached across reruns
+    show_figure(lambda: acf_pacf_figure(load_correlogram(data.index[0], data.index[-1], nlags, site)),
+                lambda: ('acf_pacf', frame_digest(data), nlags))
+
+@REGISTRY.timed('panel.distribution_kde')
 def plot_distribution_kde(data):
-    fig = px.histogram(
-        data,
-        x='Unique_Visits',
-        nbins=30,
-        marginal='rug',
-        histnorm='density',
-        title='Distribution and KDE of Unique Visits',
-        color_discrete_sequence=['#1f62b7']
-    )
-    fig.update_layout(
-        plot_bgcolor='rgba(252, 255, 255, 0)',
-        paper_bgcolor='rgba(252, 255, 255, 0)',
-        font_color='#fdfefe'
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    show_figure(lambda: distribution_kde_figure(data), lambda: ('distribution_kde', frame_digest(data)))
 
+@REGISTRY.timed('panel.violin')
 def plot_violin(data):
-    fig = px.violin(
-        data,
-        x='Day',
-        y='Unique_Visits',
-        labels={'Unique_Visits': 'Unique Visits', 'Day': 'Date'},
-        box=True,
-        points='all',
-        color='Day',
-        title='Distribution of Unique Visits by Day of the Week (Violin Plot)',
-        color_discrete_sequence=['#002f7a', '#114898', '#1f62b7', '#2b7ed7', '#509beb', '#7bbbf2', '#9ddbf9']
-    )
-    fig.update_layout(
-        template='plotly_white',
-        plot_bgcolor='rgba(252, 255, 255, 0)',
-        paper_bgcolor='rgba(252, 255, 255, 0)',
-        font_color='#fdfefe',
-        showlegend=False
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-def plot_moving_average(data, window=7):
-    df = data.sort_values('Date')
-    df['Moving_Avg'] = df['Unique_Visits'].rolling(window=window).mean()
-    fig = px.line(
-        df,
-        x='Date',
-        y=['Unique_Visits', 'Moving_Avg'],
-        labels={'value': 'Count', 'variable': 'Metric', 'Date': 'Date'},
-        title=f'Moving Average ({window} days) of Unique Visits',
-        color_discrete_sequence=['#002f7a', '#509beb']
-    )
-    fig.update_layout(
-        plot_bgcolor='rgba(252, 255, 255, 0)',
-        paper_bgcolor='rgba(252, 255, 255, 0)',
-        font_color='#fdfefe',
-        legend=dict(bgcolor='rgba(252, 255, 255, 0)', bordercolor='#fdfefe', borderwidth=1),
-    )
-    fig.update_traces(mode='lines+markers')
-    st.plotly_chart(fig, use_container_width=True)
+    show_figure(lambda: violin_figure(data), lambda: ('violin', frame_digest(data)))
 
-def plot_forecast(data: pd.DataFrame, days: int):
-    df = data.copy()
-    df = df.sort_values('Date')
-    df.set_index('Date', inplace=True)
+@REGISTRY.timed('panel.moving_average')
+def plot_moving_average(data, window=7, site=None):
+    # The rolling windows reach back before the range, so the key covers the whole history
+    state = load_live().state(site)
+    show_figure(lambda: moving_average_figure(data, state.rolling, state.pyramid, window),
+                lambda: ('moving_average', state.digest, str(data.index[0]), str(data.index[-1]), window))
 
-    last_date = df.index.max()
-    forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=days)
+@REGISTRY.timed('panel.anomalies')
+def plot_anomalies(data, threshold, metrics, site=None):
+    # Track and pyramid from the same version; returns the flagged days for the notes
+    state = load_live().state(site)
+    st.plotly_chart(anomaly_figure(data, state.anomalies, state.pyramid, threshold, metrics), use_container_width=True)
+    return state.anomalies.flagged(data, threshold, metrics)
 
-    series_list = ['First_Time_Visits', 'Returning_Visits']
+@REGISTRY.timed('panel.forecast')
+def plot_forecast(data: pd.DataFrame, days: int, pending=None,
+                  series_list=('First_Time_Visits', 'Returning_Visits'), orders=None, engine='arima', site=None):
+    if engine != 'arima':
+        # The NumPy engines forecast every series at once in milliseconds; no worker is needed
+        forecasts = weekday_forecasts(data, days, series_list, engine=engine)
+        st.plotly_chart(forecast_figure(forecasts, days), use_container_width=True)
+        return
+    orders = orders or {}
+    pending = dict(pending or {})
+    # Fits for orders that were not prefetched are started now
+    for col in series_list:
+        order = tuple(orders.get(col, DEFAULT_ORDER))
+        if (col, order) not in pending:
+            pending.update(prefetch_forecasts(data, [col], {col: order}, site))
+    executor = load_forecast_executor()
+    last_date = data.index[-1]
+
+    # Reserve the chart's place; the rest of the page keeps rendering while models fit
+    placeholder = st.empty()
+    placeholder.info("Computing forecast...")
     forecasts = {}
 
     for col in series_list:
-        ts = df[col].dropna()
-        model = ARIMA(ts, order=(5,1,0))
-        model_fit = model.fit()
-        forecast = model_fit.forecast(steps=days)
-        # Create DataFrame with dates and forecasted values
-        forecast_df = pd.DataFrame({'Date': forecast_dates, 'Forecast': forecast.values})
-        # Extract day of the week in text (e.g., Monday, Tuesday)
-        forecast_df['DayOfWeek'] = forecast_df['Date'].dt.day_name()
-
-        # Calculate average by day of the week
-        avg_by_day = forecast_df.groupby('DayOfWeek')['Forecast'].mean()
-        
-        # Order days of the week in natural order Monday to Sunday
-        days_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        avg_by_day = avg_by_day.reindex([d.capitalize() for d in days_order])
-        forecasts[col] = avg_by_day.fillna(0).values.tolist()
-
-    categories = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-
-    fig = go.Figure()
-
-    for col, color in zip(series_list, ['#002f7a', '#509beb']):
-        values = forecasts[col]
-        values.append(values[0])  # close polygon
-        fig.add_trace(go.Scatterpolar(
-            r=values,
-            theta=categories + [categories[0]],
-            fill='toself',
-            name=col.replace('_', ' '),
-            line=dict(color=color)
-        ))
-
-    fig.update_layout(
-        polar=dict(
-            bgcolor='rgba(252, 255, 255, 0)',
-            radialaxis=dict(
-                visible=True,
-                color='#fdfefe',
-                gridcolor='#7bbbf2'
-            ),
-            angularaxis=dict(
-                tickfont=dict(color='#fdfefe')
-            )
-        ),
-        plot_bgcolor='rgba(252, 255, 255, 0)',
-        paper_bgcolor='rgba(252, 255, 255, 0)',
-        font_color='#fdfefe',
-        title=f'Radar Forecast by Day of the Week - Next {days} Days',
-        legend=dict(bgcolor='rgba(252, 255, 255, 0)', bordercolor='#fdfefe', borderwidth=1),
-        margin=dict(l=50, r=50, t=70, b=50),
-        height=500,
-        hovermode='closest'
-    )
+        try:
+            # Changing the horizon reuses the cached fit; only a new range or series refits
+            state = executor.result(pending[(col, tuple(orders.get(col, DEFAULT_ORDER)))])
+        except FutureTimeoutError:
+            placeholder.warning(f"The forecast for {col.replace('_', ' ')} took too long and was skipped.")
+            return
+        except BrokenProcessPool:
+            # The executor starts a fresh pool for the next fit, so a rerun recovers
+            placeholder.warning(f"The forecast for {col.replace('_', ' ')} failed in its worker process and was skipped.")
+            return
+        forecasts[col] = average_by_weekday(state.forecast(days), last_date)
+
+    placeholder.plotly_chart(forecast_figure(forecasts, days), use_container_width=True)
+
+@REGISTRY.timed('panel.backtest')
+def plot_backtest(data: pd.DataFrame, series: str, engine: str = 'arima', horizon: int = 30, order=DEFAULT_ORDER):
+    # Rolling-origin errors of one model over the selected range; returns them for the notes
+    with st.spinner("Backtesting forecasts..."):
+        result = load_backtester().run(series, data[series].dropna(), horizon, engine, order)
+    if result is None:
+        st.warning("The selected range is too short to backtest this horizon, or the backtest took too long.")
+        return None
+    title = f"Backtest of {ENGINE_LABELS[engine]} on {series.replace('_', ' ')} ({result['origins']} origins)"
+    st.plotly_chart(backtest_figure(result, title), use_container_width=True)
+    return result
+
+@REGISTRY.timed('panel.table')
+def show_table(data, query, site=None):
+    # Only the visible page is sliced from the shared frame and sent to the browser
+    # Data and index from the same version, so positions stay valid if new days arrive meanwhile
+    state = load_live().state(site)
+    full = state.data
+    rows = state.table.rows(full, data.index[0], data.index[-1], **query)
+    col1, col2 = st.columns([1, 3])
+    size = col1.selectbox("Rows per page", PAGE_SIZES, index=1)
+    pages = max(1, -(-len(rows) // size))
+    number = col2.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, step=1)
+    st.dataframe(page(full, rows, number - 1, size), hide_index=True, use_container_width=True,
+                 column_config={'Date': st.column_config.DateColumn(format='YYYY-MM-DD')})
+    first = (number - 1) * size
+    st.caption(f"Rows {min(first + 1, len(rows)):,}-{min(first + size, len(rows)):,} of {len(rows):,}")
+
+    registry, url = load_export_server()
+    token = registry.register(full, rows, {'site': site, 'start': data.index[0], 'end': data.index[-1], **query})
+    links = ' · '.join(f"[{fmt.upper()}]({url}/export/{token}.{fmt})" for fmt in EXPORTERS)
+    st.markdown(f"Download the selection: {links}")
 
-    st.plotly_chart(fig, use_container_width=True)
+def show_debug_sidebar(run):
+    # Per-stage breakdown of this rerun plus process-wide cache counters; off unless asked for
+    if not st.sidebar.checkbox("Show performance breakdown"):
+        return
+    st.sidebar.subheader("This rerun")
+    breakdown = pd.DataFrame(run, columns=['Stage', 'Seconds'])
+    st.sidebar.dataframe(breakdown.style.format({'Seconds': '{:.3f}'}), hide_index=True, use_container_width=True)
+    snapshot = REGISTRY.snapshot()
+    requests = {key: value for key, value in snapshot['counters'].items() if key.startswith('cache_requests')}
+    rows = []
+    for key, count in requests.items():
+        misses = snapshot['counters'].get(key.replace('cache_requests', 'cache_misses', 1), 0)
+        rows.append((key[key.index('"') + 1:-2], count - misses, misses))
+    st.sidebar.subheader("Caches (all sessions)")
+    st.sidebar.dataframe(pd.DataFrame(rows, columns=['Cache', 'Hits', 'Misses']), hide_index=True, use_container_width=True)
+    for name, values in snapshot['collectors'].items():
+        st.sidebar.caption(f"{name.replace('_', ' ')}: " + ', '.join(f'{key} {value}' for key, value in values.items()))
+    st.sidebar.download_button("Download metrics (JSON)", REGISTRY.to_json(), file_name='metrics.json', mime='application/json')
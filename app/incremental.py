@@ -0,0 +1,18 @@
+import pandas as pd
+
+
+class Incremental:
+    # Base of the structures built once per data version over a calendar frame (see live.SiteState).
+    # extended(data) takes a frame whose first len(self.index) rows are the ones this instance was
+    # built on and returns the structure of all of `data`, computed from the new rows only.
+    # Instances are never modified, so a reader holding the previous version is unaffected.
+
+    def extended(self, data: pd.DataFrame):
+        fields = self._extend(data, len(self.index))
+        new = object.__new__(type(self))
+        new.__dict__.update(self.__dict__, index=pd.DatetimeIndex(data.index), **fields)
+        return new
+
+    def _extend(self, data: pd.DataFrame, n: int) -> dict:
+        # Attributes of the extended instance that differ from this one; `n` rows were covered
+        raise NotImplementedError
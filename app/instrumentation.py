@@ -0,0 +1,141 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Prefix of every exported Prometheus metric
+NAMESPACE = 'web_traffic'
+
+
+def _label(value) -> str:
+    # A label value as the text format quotes it: backslash, double quote and newline escaped
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics:
+    # Process-wide timings and counters. Timings aggregate across reruns and sessions;
+    # a rerun can also collect its own breakdown with start_run().
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._counters = {}
+        self._collectors = {}
+        self._local = threading.local()
+
+    def start_run(self) -> list:
+        # Stages timed on this thread from now on are also appended to the returned list
+        self._local.run = []
+        return self._local.run
+
+    @contextmanager
+    def timer(self, stage: str):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - began)
+
+    def timed(self, stage: str):
+        # Decorator form of timer()
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            count, total, peak = self._timings.get(stage, (0, 0.0, 0.0))
+            self._timings[stage] = (count + 1, total + seconds, max(peak, seconds))
+        run = getattr(self._local, 'run', None)
+        if run is not None:
+            run.append((stage, seconds))
+
+    def count(self, name: str, value: int = 1, **labels):
+        key = (name, ','.join(f'{label}="{_label(labels[label])}"' for label in sorted(labels)))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def register(self, name: str, collect):
+        # collect() returns {counter: value}, read at export time (e.g. hits of a model cache)
+        with self._lock:
+            self._collectors[name] = collect
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            timings = dict(self._timings)
+            counters = dict(self._counters)
+            collectors = dict(self._collectors)
+        return {
+            'timings': {
+                stage: {'count': count, 'total_seconds': total, 'mean_seconds': total / count, 'max_seconds': peak}
+                for stage, (count, total, peak) in sorted(timings.items())
+            },
+            'counters': {f'{name}{{{label}}}': value for (name, label), value in sorted(counters.items())},
+            'collectors': {name: dict(collect()) for name, collect in sorted(collectors.items())}
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        # Prometheus text exposition format, version 0.0.4
+        with self._lock:
+            timings = sorted(self._timings.items())
+            counters = sorted(self._counters.items())
+            collectors = sorted(self._collectors.items())
+        lines = [
+            f'# HELP {NAMESPACE}_stage_seconds Wall time spent in each dashboard stage and panel.',
+            f'# TYPE {NAMESPACE}_stage_seconds summary'
+        ]
+        for stage, (count, total, _) in timings:
+            lines.append(f'{NAMESPACE}_stage_seconds_count{{stage="{_label(stage)}"}} {count}')
+            lines.append(f'{NAMESPACE}_stage_seconds_sum{{stage="{_label(stage)}"}} {total:.6f}')
+        lines += [
+            f'# HELP {NAMESPACE}_stage_seconds_max Slowest single run of each stage.',
+            f'# TYPE {NAMESPACE}_stage_seconds_max gauge'
+        ]
+        lines += [f'{NAMESPACE}_stage_seconds_max{{stage="{_label(stage)}"}} {peak:.6f}' for stage, (_, _, peak) in timings]
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f'# TYPE {NAMESPACE}_{name}_total counter')
+            lines += [f'{NAMESPACE}_{name}_total{{{label}}} {value}' for (n, label), value in counters if n == name]
+        for name, collect in collectors:
+            lines.append(f'# TYPE {NAMESPACE}_{name} gauge')
+            lines += [f'{NAMESPACE}_{name}{{counter="{_label(key)}"}} {value}' for key, value in collect().items()]
+        return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(metrics: Metrics, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    # /metrics in Prometheus text format and /metrics.json, served from a daemon thread
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = metrics.to_prometheus(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = metrics.to_json(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+
+# Shared by every module of the process
+REGISTRY = Metrics()
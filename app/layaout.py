@@ -2,7 +2,183 @@ import streamlit as st
 import datetime
 import pandas as pd
 from typing import Callable
-from babel.dates import format_date
+from rollup import CalendarRollup
+from rolling import RollingStats
+from panels import compute_insights
+from instrumentation import REGISTRY
+from datastore import COUNT_COLUMNS, DAY_NAMES, MONTH_NAMES
+from table import SORT_COLUMNS
+from fast_forecast import ENGINE_LABELS
+from forecasting import DEFAULT_ORDER
+
+# Series forecast until the user picks others
+FORECAST_SERIES = ['First_Time_Visits', 'Returning_Visits']
+
+def long_date(day) -> str:
+    # 'August 19, 2020', the en_US long date format
+    day = pd.Timestamp(day)
+    return f'{day:%B} {day.day}, {day.year}'
+
+# Each section with its own widgets is a fragment: changing one of its inputs reruns only
+# that section. Sections behind a toggle are not computed while they are switched off.
+
+@st.fragment
+def acf_pacf_section(data: pd.DataFrame, plot_acf_pacf: Callable, lag1_autocorr: float):
+    nlags = st.slider("**Number of lags:**", min_value=10, max_value=365, value=30, step=1)
+    plot_acf_pacf(data, nlags)
+    st.markdown(f"""
+        - The first autocorrelation value is **{lag1_autocorr:.2f}**.
+    """)
+
+@st.fragment
+def distribution_section(data: pd.DataFrame, plot_violin: Callable, plot_moving_average: Callable, most_dispersed_day: str):
+    if not st.toggle("Distribution and Violin Plot", value=True, key='show_distribution'):
+        return
+    st.markdown("""
+        The violin plot complements the boxplot by showing the density of unique visits by day of the week. 
+        This visualization allows us to see not only the median and quartiles but also how visits are distributed 
+        throughout each day. Additionally, the moving average helps us smooth out fluctuations 
+        and observe long-term patterns in traffic.
+    """)
+    plot_violin(data)
+    plot_moving_average(data)
+    st.markdown(f""" 
+        - The day with the highest visit dispersion is **{most_dispersed_day}**.
+
+    """)
+
+@st.fragment
+def anomaly_section(data: pd.DataFrame, plot_anomalies: Callable):
+    if not st.toggle("Anomaly Detection", value=True, key='show_anomalies'):
+        return
+    st.markdown("""
+        Each day is compared with the recent history of the same day of the week. Days that fall 
+        unusually far from that baseline are marked on the chart, which helps separate real traffic 
+        changes from the normal weekly rhythm.
+    """)
+    col1, col2 = st.columns(2)
+    threshold = col1.slider("**Sensitivity (z-score):**", min_value=2.0, max_value=5.0, value=3.0, step=0.5,
+                            help="Lower values flag more days")
+    metrics = col2.multiselect(
+        "**Metrics:**", COUNT_COLUMNS, default=COUNT_COLUMNS, format_func=lambda col: col.replace('_', ' ')
+    )
+    if not metrics:
+        return
+    flagged = plot_anomalies(data, threshold, metrics)
+    if flagged.empty:
+        st.markdown("- No anomalies were flagged in the selected period.")
+        return
+    latest = flagged.iloc[-1]
+    st.markdown(f"""
+        - **{flagged['Date'].nunique()}** days were flagged in the selected period.
+        - The most recent one is **{latest['Date'].date().isoformat()}**: {latest['Metric'].replace('_', ' ')} was 
+          **{latest['Value']:,}** against an expected **{latest['Expected']:,.0f}**.
+    """)
+
+@st.fragment
+def forecast_section(data: pd.DataFrame, plot_forecast: Callable, select_orders: Callable, pending_forecasts: dict):
+    if not st.toggle("Traffic Forecast", value=True, key='show_forecast'):
+        return
+    st.markdown("""
+        In this section, we can predict the traffic of our website for the upcoming days. 
+        By entering the number of days we wish to forecast, we will use an ARIMA model (or one of 
+        the faster models below) to estimate future visits. This is useful for anticipating traffic spikes and preparing 
+        appropriate strategies to handle site load.
+    """)
+    days = st.number_input(
+        "**Number of days for forecast:**",
+        min_value=1, max_value=90, value=30, step=1,
+        help="Choose how many days ahead you want to predict"
+    )
+    series_list = st.multiselect(
+        "**Series to forecast:**",
+        COUNT_COLUMNS,
+        default=FORECAST_SERIES, key='forecast_series',
+        format_func=lambda col: col.replace('_', ' ')
+    )
+    engine = st.radio(
+        "**Model:**", list(ENGINE_LABELS), horizontal=True, key='forecast_engine', format_func=ENGINE_LABELS.get,
+        help="ARIMA is the most detailed; the other models fit every series at once in milliseconds"
+    )
+    orders = {}
+    if engine == 'arima' and st.checkbox(
+        "Select the ARIMA order automatically", key='auto_order',
+        help="Picks d with a unit-root test, then searches p and q in parallel and keeps the best order for this date range"
+    ) and series_list:
+        col_a, col_b = st.columns(2)
+        criterion = col_a.radio("Criterion", ['aic', 'bic'], horizontal=True, format_func=str.upper, key='order_criterion')
+        seasonal = col_b.checkbox("Include weekly seasonal terms", key='order_seasonal')
+        with st.spinner("Searching ARIMA orders..."):
+            orders = select_orders(data, series_list, criterion, seasonal)
+        # Remembered with their date range, so the next full rerun can prefetch these fits
+        st.session_state['forecast_orders'] = (data.index[0], data.index[-1], orders)
+    if series_list:
+        plot_forecast(data, days, pending_forecasts, series_list, orders, engine)
+    if engine != 'arima':
+        st.markdown(f"""
+        - The {ENGINE_LABELS[engine]} model predicts the general traffic trend for the next {days} days.
+    """)
+        return
+    order_text = ', '.join(f"{col.replace('_', ' ')} {orders[col]}" for col in orders) or '(5, 1, 0)'
+    st.markdown(f"""            
+        - The ARIMA model predicts the general traffic trend for the next {days} days.
+        - Model order: **{order_text}**.
+    """)
+
+@st.fragment
+def backtest_section(data: pd.DataFrame, plot_backtest: Callable, select_orders: Callable):
+    # Off by default: a backtest fits a model at many origins
+    if not st.toggle("Forecast Backtest", value=False, key='show_backtest'):
+        return
+    st.markdown("""
+        A backtest replays the forecast from weekly origins across the selected period and compares 
+        each prediction with what actually happened, so we can see how far ahead the model stays 
+        reliable and on which days of the week it misses the most.
+    """)
+    col1, col2, col3 = st.columns(3)
+    series = col1.selectbox("**Series:**", COUNT_COLUMNS, index=1, format_func=lambda col: col.replace('_', ' '))
+    engine = col2.selectbox("**Model:**", list(ENGINE_LABELS), format_func=ENGINE_LABELS.get)
+    horizon = col3.select_slider("**Days ahead:**", [7, 14, 30], value=30)
+    order, selected = DEFAULT_ORDER, engine == 'arima' and st.session_state.get('auto_order', False)
+    if selected:
+        # The order the forecast section selected (memoized, so only searched again for a new series)
+        criterion, seasonal = st.session_state.get('order_criterion', 'aic'), st.session_state.get('order_seasonal', False)
+        order = select_orders(data, [series], criterion, seasonal)[series]
+    result = plot_backtest(data, series, engine, horizon, order)
+    if result is None:
+        return
+    worst_day = result['weekday']['MAPE'].idxmax()
+    st.markdown(f"""
+        - Over **{result['origins']}** origins the mean absolute percentage error is **{result['mape']:.1f}%** 
+          (MAE **{result['mae']:,.0f}** visits).
+        - One day ahead it is **{result['horizon']['MAPE'].iloc[0]:.1f}%**, and {horizon} days ahead **{result['horizon']['MAPE'].iloc[-1]:.1f}%**.
+        - The model misses the most on **{worst_day}**.
+    """)
+    if engine == 'arima':
+        st.markdown(f"""
+        - ARIMA order: **{order}**{' (selected automatically, as in the forecast above)' if selected else ''}.
+    """)
+
+@st.fragment
+def table_section(data: pd.DataFrame, show_table: Callable):
+    # Filters and sorting are applied on the server; only the page shown is sent to the browser
+    with st.expander("Filter and sort"):
+        col1, col2 = st.columns(2)
+        days = col1.multiselect("Days", DAY_NAMES)
+        months = col2.multiselect("Months", MONTH_NAMES)
+        col1, col2, col3 = st.columns(3)
+        column = col1.selectbox("Filter visits by", COUNT_COLUMNS, index=1, format_func=lambda col: col.replace('_', ' '))
+        minimum = col2.number_input("Minimum", min_value=0, value=0, step=100)
+        maximum = col3.number_input("Maximum (0 for no limit)", min_value=0, value=0, step=100)
+        col1, col2 = st.columns(2)
+        sort_by = col1.selectbox("Sort by", SORT_COLUMNS, format_func=lambda col: col.replace('_', ' '))
+        ascending = col2.radio("Order", [True, False], horizontal=True,
+                               format_func=lambda asc: 'Ascending' if asc else 'Descending')
+    query = {
+        'days': days, 'months': months, 'column': column, 'minimum': minimum or None,
+        'maximum': maximum or None, 'sort_by': sort_by, 'ascending': ascending
+    }
+    show_table(data, query)
 
 def generate_layout(
     data: pd.DataFrame,
@@ -11,8 +187,28 @@ def generate_layout(
     plot_forecast: Callable,
     plot_acf_pacf: Callable,
     plot_violin: Callable,
-    plot_moving_average: Callable
+    plot_moving_average: Callable,
+    rollup: CalendarRollup,
+    prefetch_forecasts: Callable,
+    select_orders: Callable,
+    rolling: RollingStats,
+    show_table: Callable,
+    plot_anomalies: Callable,
+    plot_backtest: Callable
 ):
+    # The models the forecast section will show fit on worker processes while the panels below
+    # render: its selected series, at the orders it selected automatically for this range. Nothing
+    # is prefetched while it is switched off, set to a NumPy model, or its orders are not known yet.
+    pending_forecasts = {}
+    state = st.session_state
+    if state.get('show_forecast', True) and state.get('forecast_engine', 'arima') == 'arima':
+        orders = {}
+        if state.get('auto_order'):
+            start, end, orders = state.get('forecast_orders', (None, None, None))
+            if (start, end) != (data.index[0], data.index[-1]):
+                orders = None
+        if orders is not None:
+            pending_forecasts = prefetch_forecasts(data, state.get('forecast_series', FORECAST_SERIES), orders)
     
     st.markdown(
         """
@@ -106,11 +302,12 @@ def generate_layout(
         unsafe_allow_html=True
     )
     
+    # Card and note values are computed outside Streamlit so report.py can reuse them
+    with REGISTRY.timer('insights'):
+        insights = compute_insights(data, rollup, rolling)
+    trend = insights['weekly_trend']
+
     # Storytelling and general insights at the beginning with responsive cards
-    max_day = data.loc[data['Unique_Visits'].idxmax()]
-    min_day = data.loc[data['Unique_Visits'].idxmin()]
-    avg_visits = int(data['Unique_Visits'].mean())
-    trend = data['Unique_Visits'].rolling(7).mean().iloc[-1] - data['Unique_Visits'].rolling(7).mean().iloc[-8]
     trend_icon = '🔼' if trend > 0 else '🔽'
     trend_text = 'increased' if trend > 0 else 'decreased'
 
@@ -118,25 +315,25 @@ def generate_layout(
     col3, col4 = st.columns(2)
 
     with col1:
-        maximum_day = format_date(max_day['Date'], format='long', locale='en_US')
+        maximum_day = long_date(insights['max_date'])
         st.markdown(f"""
         <div class='insight-card' style='background: linear-gradient(135deg, #6dd5ed, #2193b0); padding: 20px; border-radius: 12px; height: 200px;'>
             <span class='emoji' style='font-size:2.5rem;'>📈</span>
             <div class='label'><b>Record Day</b></div>
             <div>{maximum_day}</div>
-            <div class='main-value' style='color:#ffffff; font-size: 2rem; font-weight: bold;'>{max_day['Unique_Visits']:,}</div>
+            <div class='main-value' style='color:#ffffff; font-size: 2rem; font-weight: bold;'>{insights['max_visits']:,}</div>
             <div class='desc' style='color: #ffffff;'>unique visits</div>
         </div>
         """, unsafe_allow_html=True)
 
     with col2:
-        minimum_day = format_date(min_day['Date'], format='long', locale='en_US')
+        minimum_day = long_date(insights['min_date'])
         st.markdown(f"""
         <div class='insight-card' style='background: linear-gradient(135deg, #ff758c, #ff7eb3); padding: 16px; border-radius: 12px; height: 200px;'>
             <span class='emoji' style='font-size:2rem;'>📉</span>
             <div class='label'><b>Lowest Day</b></div>
             <div>{minimum_day}</div>
-            <div class='main-value' style='color:#ffffff; font-size: 1.5rem;'>{min_day['Unique_Visits']:,}</div>
+            <div class='main-value' style='color:#ffffff; font-size: 1.5rem;'>{insights['min_visits']:,}</div>
             <div class='desc' style='color: #ffffff;'>unique visits</div>
         </div>
         """, unsafe_allow_html=True)
@@ -146,7 +343,7 @@ def generate_layout(
         <div class='insight-card' style='background: linear-gradient(135deg, #fbc2eb, #a6c1ee); padding: 12px; border-radius: 12px; height: 200px;'>
             <span class='emoji' style='font-size:1.8rem;'>📊</span>
             <div class='label'><b>Daily Average</b></div>
-            <div class='main-value' style='color:#1f62b7; font-size: 1.3rem;'>{avg_visits:,}</div>
+            <div class='main-value' style='color:#1f62b7; font-size: 1.3rem;'>{insights['avg_visits']:,}</div>
             <div class='desc' style='color: #1f62b7;'>unique visits</div>
         </div>
         """, unsafe_allow_html=True)
@@ -175,8 +372,8 @@ def generate_layout(
         """)
         plot_heatmap(data)
         st.markdown(f"""
-            - The day with the highest traffic is usually **{data.groupby('Day_Name')['Unique_Visits'].mean().idxmax()}**.
-            - The strongest month on average is **{data.groupby(data['Date'].dt.month_name().str.slice(stop=3))['Unique_Visits'].mean().idxmax()}**.
+            - The day with the highest traffic is usually **{insights['best_day']}**.
+            - The strongest month on average is **{insights['best_month']}**.
         """)
 
     with col2:
@@ -188,8 +385,8 @@ def generate_layout(
         """)
         plot_boxplot(data)
         st.markdown(f"""
-            - The median of unique visits is **{int(data['Unique_Visits'].median())}**.
-            - The interquartile range is **{int(data['Unique_Visits'].quantile(0.75) - data['Unique_Visits'].quantile(0.25))}**.
+            - The median of unique visits is **{insights['median_visits']}**.
+            - The interquartile range is **{insights['iqr_visits']}**.
         """)
 
     st.markdown("<hr>", unsafe_allow_html=True)
@@ -200,47 +397,23 @@ def generate_layout(
         the relationship between observations at different points in time. 
         These tools are fundamental for time series analysis and for building predictive models.
     """)
-    plot_acf_pacf(data)
-    st.markdown(f"""
-        - The first autocorrelation value is **{data['Unique_Visits'].autocorr():.2f}**.
-    """)
+    acf_pacf_section(data, plot_acf_pacf, insights['lag1_autocorr'])
 
     st.markdown("<hr>", unsafe_allow_html=True)
 
     st.subheader("Analysis of Unique Visits Distribution by Day of the Week")
-    with st.expander("Distribution and Violin Plot", expanded=True):
-        st.markdown("""
-            The violin plot complements the boxplot by showing the density of unique visits by day of the week. 
-            This visualization allows us to see not only the median and quartiles but also how visits are distributed 
-            throughout each day. Additionally, the moving average helps us smooth out fluctuations 
-            and observe long-term patterns in traffic.
-        """)
-        plot_violin(data)
-        plot_moving_average(data)
-        st.markdown(f""" 
-            - The day with the highest visit dispersion is **{data.groupby('Day_Name')['Unique_Visits'].std().idxmax()}**.
+    distribution_section(data, plot_violin, plot_moving_average, insights['most_dispersed_day'])
 
-        """)
+    st.markdown("<hr>", unsafe_allow_html=True)
+
+    st.subheader("Traffic Anomalies")
+    anomaly_section(data, plot_anomalies)
 
     st.markdown("<hr>", unsafe_allow_html=True)
 
     st.subheader("Forecasting Future Visits to Optimize Strategies")
-    with st.expander("Traffic Forecast", expanded=True):
-        st.markdown("""
-            In this section, we can predict the traffic of our website for the upcoming days. 
-            By entering the number of days we wish to forecast, we will use an ARIMA model to 
-            estimate future visits. This is useful for anticipating traffic spikes and preparing 
-            appropriate strategies to handle site load.
-        """)
-        days = st.number_input(
-            "**Number of days for forecast:**",
-            min_value=1, max_value=90, value=30, step=1,
-            help="Choose how many days ahead you want to predict"
-        )
-        plot_forecast(data, days)
-        st.markdown(f"""            
-            - The ARIMA model predicts the general traffic trend for the next {days} days.
-        """)
+    forecast_section(data, plot_forecast, select_orders, pending_forecasts)
+    backtest_section(data, plot_backtest, select_orders)
     
     st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -249,13 +422,7 @@ def generate_layout(
         Here you can see the filtered data that was used to generate the previous visualizations. 
         This table allows you to explore the data in detail and perform additional analyses if desired.
     """)
-    data_frame = data[['Day', 'Day_Of_Week', 'Date', 'Page_Loads', 'Unique_Visits', 'First_Time_Visits', 'Returning_Visits', 'Month']]
-    data_frame.columns = ['Day', 'Day of the Week', 'Date', 'Page Loads', 'Unique Visits', 'First Time Visits', 'Returning Visits', 'Month']
-    data_frame['Date'] = pd.to_datetime(data_frame['Date']).dt.date
-    styled_data = data_frame.style.set_table_attributes('style="width:100%; text-align: center; vertical-align: middle !important;"') \
-        .set_properties(**{'text-align': 'center',' vertical-align': 'middle !important'}) \
-        .set_caption("Filtered Data")
-    st.dataframe(styled_data, hide_index=True, use_container_width=True)
+    table_section(data, show_table)
 
     # Add the footer
     st.markdown("<hr>", unsafe_allow_html=True)
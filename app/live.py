@@ -0,0 +1,203 @@
+import functools
+import io
+import os
+import threading
+import urllib.parse
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from anomalies import AnomalyTrack
+from datastore import COUNT_COLUMNS, append_sites, calendar_frame, frame_digest, iter_csv_chunks, load_sites, site_name, site_view
+from instrumentation import REGISTRY
+from rendering import ResolutionPyramid
+from rolling import RollingStats
+from rollup import CalendarRollup
+from table import TableIndex
+
+# Seconds between two polls of the live feeds
+POLL_SECONDS = 30
+# Seconds to wait for an HTTP feed to answer
+FEED_TIMEOUT = 10
+
+
+class SiteState:
+    # One version of a site's data and every aggregate derived from it. A version is never
+    # modified: appending builds the next one from the new rows only and swaps it in.
+
+    def __init__(self, data: pd.DataFrame, rollup: CalendarRollup, rolling: RollingStats,
+                 pyramid: ResolutionPyramid, table: TableIndex, anomalies: AnomalyTrack):
+        self.data = data
+        self.rollup = rollup
+        self.rolling = rolling
+        self.pyramid = pyramid
+        self.table = table
+        self.anomalies = anomalies
+
+    @functools.cached_property
+    def digest(self) -> str:
+        # Content digest, so results derived from the whole history can be shared between processes
+        return frame_digest(self.data)
+
+    @classmethod
+    def build(cls, data: pd.DataFrame) -> 'SiteState':
+        return cls(data, CalendarRollup(data), RollingStats(data), ResolutionPyramid(data, COUNT_COLUMNS), TableIndex(data),
+                   AnomalyTrack(data))
+
+    def extended(self, rows: pd.DataFrame) -> 'SiteState':
+        # rows: store-layout rows dated after the last day of this version
+        days = rows['Date'].to_numpy().astype('datetime64[D]').astype(np.int32)
+        counts = {col: rows[col].to_numpy().astype(np.int32) for col in COUNT_COLUMNS}
+        data = calendar_frame(days, counts, base=self.data)
+        return SiteState(data, self.rollup.extended(data), self.rolling.extended(data),
+                         self.pyramid.extended(data), self.table.extended(data), self.anomalies.extended(data))
+
+
+class LiveDataset:
+    # Every site of the dashboard plus the state of each site viewed so far. New days are
+    # appended while the process runs; only the sites they belong to are extended, and the
+    # all-sites total is rebuilt the next time it is viewed.
+
+    def __init__(self, sources):
+        self.sources = list(sources)
+        self._frame = load_sites(self.sources)
+        # (site, rows) appended since the compact frame was last combined; a poll only adds to
+        # this list, and the rows are copied into the frame when a new view of it is needed
+        self._pending = []
+        self.names = list(self._frame['Site'].cat.categories)
+        self.version = 0
+        self.appended = 0
+        self._states = {}
+        self._lock = threading.Lock()
+        self._append_lock = threading.Lock()
+
+    def _key(self, site):
+        return self.names[0] if site is None and len(self.names) == 1 else site
+
+    def state(self, site: str = None) -> SiteState:
+        # Latest version of a site, or of the daily total of all sites when site is None
+        site = self._key(site)
+        with self._lock:
+            state, version = self._states.get(site), self.version
+        if state is None:
+            state = SiteState.build(site_view(self.frame(), site))
+            with self._lock:
+                # Keep it unless rows were appended while it was being built
+                if self.version == version:
+                    state = self._states.setdefault(site, state)
+        return state
+
+    def frame(self) -> pd.DataFrame:
+        # Compact frame of every site, with the appended rows; combined outside the lock, so
+        # polls and other sessions are not held up meanwhile
+        with self._lock:
+            frame, pending = self._frame, list(self._pending)
+        if not pending:
+            return frame
+        combined = append_sites(frame, pending)
+        with self._lock:
+            if self._frame is frame:
+                self._frame, self._pending = combined, self._pending[len(pending):]
+        return combined
+
+    def append(self, site: str, rows: pd.DataFrame) -> int:
+        # Appends the rows dated after the site's last day; returns how many were new
+        with self._append_lock:
+            state = self.state(site)
+            rows = rows[rows['Date'] > state.data.index[-1]].drop_duplicates('Date', keep='last').sort_values('Date')
+            if rows.empty:
+                return 0
+            extended = state.extended(rows)
+            with self._lock:
+                self._pending.append((site, rows))
+                self._states[site] = extended
+                self._states.pop(None, None)
+                self.version += 1
+                self.appended += len(rows)
+        REGISTRY.count('live_rows', len(rows), site=site)
+        return len(rows)
+
+
+def _parse(data: bytes):
+    chunks = list(iter_csv_chunks(io.BytesIO(data)))
+    return pd.concat(chunks, ignore_index=True) if chunks else None
+
+
+class DropFileFeed:
+    # Rows appended to a CSV export since the last poll. Only complete lines are read, so a
+    # writer can append at any time; a file that shrinks is read again from the start.
+
+    def __init__(self, path: str, site: str = None):
+        self.path = path
+        self.site = site or site_name(path)
+        with open(path, 'rb') as fh:
+            self.header = fh.readline()
+            self.offset = os.fstat(fh.fileno()).st_size
+
+    def poll(self, since=None):
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            self.offset = 0
+        if size == self.offset:
+            return None
+        with open(self.path, 'rb') as fh:
+            fh.seek(self.offset)
+            block = fh.read(size - self.offset)
+        complete = block.rfind(b'\n') + 1
+        if not complete:
+            return None
+        start = self.offset
+        self.offset += complete
+        # Appended lines have no header of their own
+        return _parse(block[:complete] if start == 0 else self.header + block[:complete])
+
+
+class HttpFeed:
+    # Rows of one site after a date, fetched as CSV from <url>?site=<site>&since=<YYYY-MM-DD>
+
+    def __init__(self, url: str, site: str):
+        self.url = url
+        self.site = site
+
+    def poll(self, since=None):
+        query = {'site': self.site}
+        if since is not None:
+            query['since'] = pd.Timestamp(since).strftime('%Y-%m-%d')
+        with urllib.request.urlopen(f'{self.url}?{urllib.parse.urlencode(query)}', timeout=FEED_TIMEOUT) as response:
+            return _parse(response.read())
+
+
+class LiveWatcher:
+    # Polls every feed from a daemon thread and appends what they return to the dataset
+
+    def __init__(self, dataset: LiveDataset, feeds, interval: float = POLL_SECONDS):
+        self.dataset = dataset
+        self.feeds = list(feeds)
+        self.interval = interval
+        self.last_error = None
+        self._stop = threading.Event()
+
+    def poll_once(self) -> int:
+        added = 0
+        with REGISTRY.timer('live.poll'):
+            for feed in self.feeds:
+                try:
+                    rows = feed.poll(self.dataset.state(feed.site).data.index[-1])
+                    if rows is not None:
+                        added += self.dataset.append(feed.site, rows)
+                except Exception as e:
+                    # A failing feed is retried on the next poll; the others keep running
+                    REGISTRY.count('live_errors', site=feed.site)
+                    self.last_error = f'{feed.site}: {e}'
+        return added
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll_once()
+
+    def start(self):
+        threading.Thread(target=self._run, name='live-watcher', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
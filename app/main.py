@@ -1,24 +1,61 @@
+import time
+# Time to first widget is measured from here; the app's imports below are part of it
+started = time.perf_counter()
 import streamlit as st
 import pandas as pd
 import datetime
+from functools import partial
 from functions import (
     load_data,
+    load_rolling,
+    load_rollup,
     plot_heatmap,
     plot_boxplot,
     plot_forecast,
     plot_acf_pacf,
     plot_violin,
-    plot_moving_average
+    plot_moving_average,
+    plot_anomalies,
+    plot_backtest,
+    prefetch_forecasts,
+    select_date_range,
+    select_orders,
+    show_debug_sidebar,
+    load_metrics_server,
+    show_table,
+    site_names
 )
+from instrumentation import REGISTRY
+import preload
 from layaout import generate_layout
 
 st.set_page_config(page_title="Dashboard de Tráfico Web", layout="wide")
 
-START_DATE = pd.to_datetime("2014-09-14")
-END_DATE = pd.to_datetime("2020-08-19")
+load_metrics_server()
+run = REGISTRY.start_run()
 
-start_date = st.date_input("Fecha de inicio", START_DATE.date(), max_value=datetime.date(2019, 9, 1))
-end_date = st.date_input(label="Fecha de fin", value=END_DATE.date(), max_value=END_DATE.date())
+# With several exports loaded, every panel shows one site or the total of all sites
+sites = site_names()
+site = None
+if len(sites) > 1:
+    site = st.selectbox("Sitio", [None] + sites, format_func=lambda name: name or "Todos los sitios")
+
+# The start date can be picked up to this long before the newest day (2019-09-01 for data ending 2020-08-19)
+MIN_HISTORY = datetime.timedelta(days=353)
+
+raw_data = load_data(site)
+if raw_data.empty:
+    st.stop()
+
+# The picker bounds follow the data, so days appended while the app runs become selectable
+first_date, last_date = raw_data.index[0].date(), raw_data.index[-1].date()
+start_date = st.date_input("Fecha de inicio", first_date, min_value=first_date,
+                           max_value=max(first_date, last_date - MIN_HISTORY))
+end_date = st.date_input(label="Fecha de fin", value=last_date, min_value=first_date, max_value=last_date)
+st.caption(f"Datos hasta el {last_date:%d/%m/%Y}")
+REGISTRY.observe('first_widget', time.perf_counter() - started)
+# The first widgets are on screen; the modules the panels import on first use load meanwhile
+preload.start()
 
 start_date = pd.to_datetime(start_date)
 end_date = pd.to_datetime(end_date)
@@ -27,15 +64,24 @@ if start_date > end_date:
     st.error("La fecha de inicio no puede ser mayor que la fecha de fin.")
     st.stop()
 
-raw_data = load_data()
-filtered_data = raw_data[(raw_data['Date'] >= start_date) & (raw_data['Date'] <= end_date)]
+filtered_data = select_date_range(raw_data, start_date, end_date)
 
-generate_layout(
-    filtered_data,
-    plot_heatmap,
-    plot_boxplot,
-    plot_forecast,
-    plot_acf_pacf,
-    plot_violin,
-    plot_moving_average
-)
+with REGISTRY.timer('layout'):
+    generate_layout(
+        filtered_data,
+        partial(plot_heatmap, site=site),
+        plot_boxplot,
+        partial(plot_forecast, site=site),
+        partial(plot_acf_pacf, site=site),
+        plot_violin,
+        partial(plot_moving_average, site=site),
+        load_rollup(site),
+        partial(prefetch_forecasts, site=site),
+        select_orders,
+        load_rolling(site),
+        partial(show_table, site=site),
+        partial(plot_anomalies, site=site),
+        plot_backtest
+    )
+
+show_debug_sidebar(run)
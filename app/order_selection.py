@@ -0,0 +1,132 @@
+import itertools
+import math
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from executor import ForecastExecutor
+from forecasting import DEFAULT_ORDER, fit_arima, series_fingerprint
+
+P_VALUES = (0, 1, 2, 3, 4, 5)
+# Differencing orders allowed; the unit-root test picks one before p and q are searched
+D_VALUES = (0, 1)
+Q_VALUES = (0, 1, 2)
+# Weekly seasonal terms (P, D, Q, s) tried on top of every non-seasonal order
+WEEKLY_SEASONAL = ((1, 0, 0, 7), (0, 0, 1, 7), (1, 0, 1, 7))
+# Optimizer iterations for the quick screening pass
+SCREEN_MAXITER = 25
+# Screened candidates whose criterion is more than this many points worse than the best are dropped
+PRUNE_MARGIN = 100.0
+# At most this many unconverged screened candidates get a full fit
+FINALISTS = 4
+# Significance level at which the ADF test rejects a unit root
+UNIT_ROOT_ALPHA = 0.05
+
+
+def candidate_orders(p=P_VALUES, d=D_VALUES, q=Q_VALUES, seasonal: bool = False) -> list:
+    orders = list(itertools.product(p, d, q))
+    if seasonal:
+        orders += [order + seasonal_order for order in orders for seasonal_order in WEEKLY_SEASONAL]
+    return orders
+
+
+def differencing_order(ts: pd.Series, max_d: int = max(D_VALUES), alpha: float = UNIT_ROOT_ALPHA) -> int:
+    # Smallest d at which the ADF test rejects a unit root in the d-times differenced series.
+    # AIC and BIC of fits with different d come from likelihoods of different series and
+    # cannot be compared, so d is settled here and the criterion only ranks p and q.
+    from statsmodels.tsa.stattools import adfuller
+
+    values = np.asarray(ts, dtype=np.float64)
+    for d in range(max_d):
+        if adfuller(values, autolag='AIC')[1] < alpha:
+            return d
+        values = np.diff(values)
+    return max_d
+
+
+def score_order(ts: pd.Series, order, criterion: str = 'aic', maxiter: int = None):
+    # Runs in a worker process: (order, criterion value, converged). Failed fits score +inf.
+    warnings.filterwarnings('ignore')
+    try:
+        fit = fit_arima(ts, order, maxiter=maxiter)
+        score = float(getattr(fit, criterion))
+        converged = bool(fit.mle_retvals.get('converged', True)) if fit.mle_retvals else True
+    except Exception:
+        return tuple(order), math.inf, False
+    return tuple(order), (score if np.isfinite(score) else math.inf), converged
+
+
+class OrderSelector:
+    # Grid search over ARIMA orders: a unit-root test fixes d, then AIC or BIC ranks the p and q
+    # of the grid at that d in two parallel passes. A cheap screen with few optimizer iterations
+    # prunes failures and clear losers, then only the finalists are fitted to convergence.
+    # Winners are memoized per (series, data fingerprint, grid, criterion) so later forecasts
+    # skip the search.
+
+    def __init__(self, executor: ForecastExecutor, maxsize: int = 64, prune_margin: float = PRUNE_MARGIN,
+                 finalists: int = FINALISTS, screen_maxiter: int = SCREEN_MAXITER):
+        self.executor = executor
+        self.maxsize = maxsize
+        self.prune_margin = prune_margin
+        self.finalists = finalists
+        self.screen_maxiter = screen_maxiter
+        self.searches = 0
+        self.hits = 0
+        self._best = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _run(self, ts: pd.Series, orders, criterion: str, maxiter) -> list:
+        futures = [self.executor.submit(score_order, ts, order, criterion, maxiter) for order in orders]
+        results = []
+        for future in futures:
+            try:
+                results.append(self.executor.result(future))
+            except (FutureTimeoutError, BrokenProcessPool):
+                # The executor already cancelled it or replaced the pool; the order just drops out
+                pass
+        return results
+
+    def search(self, ts: pd.Series, orders=None, criterion: str = 'aic') -> tuple:
+        orders = [tuple(order) for order in (orders or candidate_orders())]
+        allowed = sorted({order[1] for order in orders})
+        if len(allowed) > 1:
+            # The grid's closest d to the tested one
+            d = differencing_order(ts, max(allowed))
+            d = min(allowed, key=lambda value: abs(value - d))
+            orders = [order for order in orders if order[1] == d]
+        screened = sorted((r for r in self._run(ts, orders, criterion, self.screen_maxiter) if math.isfinite(r[1])),
+                          key=lambda r: r[1])
+        with self._lock:
+            self.searches += 1
+        if not screened:
+            return DEFAULT_ORDER
+        # Prune clear losers; screen fits that already converged are final and need no refit
+        limit = screened[0][1] + self.prune_margin
+        finished = [r for r in screened if r[2]]
+        finalists = [order for order, score, converged in screened if score <= limit and not converged]
+        finished += self._run(ts, finalists[:self.finalists], criterion, None)
+        # Only converged fits can win; fall back to the default order if none did
+        final = [r for r in finished if r[2] and math.isfinite(r[1])]
+        if not final:
+            return DEFAULT_ORDER
+        return min(final, key=lambda r: r[1])[0]
+
+    def best_order(self, name: str, ts: pd.Series, orders=None, criterion: str = 'aic') -> tuple:
+        orders = tuple(tuple(order) for order in (orders or candidate_orders()))
+        key = (name, series_fingerprint(ts), orders, criterion)
+        with self._lock:
+            if key in self._best:
+                self.hits += 1
+                self._best.move_to_end(key)
+                return self._best[key]
+        best = self.search(ts, orders, criterion)
+        with self._lock:
+            self._best[key] = best
+            while len(self._best) > self.maxsize:
+                self._best.popitem(last=False)
+        return best
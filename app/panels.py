@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+
+from anomalies import THRESHOLD, AnomalyTrack
+from correlogram import correlogram
+from datastore import COUNT_COLUMNS, DAYS_ORDER
+from fast_forecast import forecast_matrix, weekday_profile
+from forecasting import DEFAULT_ORDER, ForecastModelCache, average_by_weekday
+from rendering import LTTB_LIMIT, PYRAMID_LEVELS, WEBGL_THRESHOLD, ResolutionPyramid, downsample, line_trace, sample_per_group
+from rolling import WINDOWS, RollingStats
+from rollup import CalendarRollup
+
+# Figure builders and insight values for every dashboard panel. Nothing here touches
+# Streamlit, so the same panels can be rendered by the dashboard or by report.py.
+# plotly is slow to import, so each figure imports the plotly modules it uses on first use.
+
+
+def correlogram_frames(data: pd.DataFrame, nlags: int = 30) -> dict:
+    # ACF and PACF of all four metrics, computed as one batch
+    values = data[COUNT_COLUMNS].dropna()
+    acf_vals, pacf_vals = correlogram(values.to_numpy(dtype=float).T, nlags)
+    return {
+        'acf': pd.DataFrame(acf_vals.T, columns=COUNT_COLUMNS),
+        'pacf': pd.DataFrame(pacf_vals.T, columns=COUNT_COLUMNS)
+    }
+
+
+def weekday_forecasts(data: pd.DataFrame, days: int, series_list, orders=None, cache: ForecastModelCache = None,
+                      engine: str = 'arima') -> dict:
+    # Mean forecast per weekday for each series; ARIMA fits in this process, the NumPy
+    # engines forecast every series in one call
+    series_list = list(series_list)
+    if engine != 'arima':
+        profile = weekday_profile(forecast_matrix(data[series_list].to_numpy(), days, engine), data.index[-1])
+        return {col: profile[:, i].tolist() for i, col in enumerate(series_list)}
+    cache = cache or ForecastModelCache()
+    orders = orders or {}
+    return {
+        col: average_by_weekday(
+            cache.get_state(col, data[col].dropna(), orders.get(col, DEFAULT_ORDER)).forecast(days), data.index[-1]
+        )
+        for col in series_list
+    }
+
+
+def compute_insights(data: pd.DataFrame, rollup: CalendarRollup, rolling: RollingStats) -> dict:
+    # Values quoted in the insight cards and the notes under each panel
+    start, end = data.index[0], data.index[-1]
+    by_day = rollup.by_day('Unique_Visits', start, end)
+    by_month = rollup.by_month('Unique_Visits', start, end)
+    weekly_mean = rolling.get('Unique_Visits', 7, 'mean', start, end)
+    max_day = data.loc[data['Unique_Visits'].idxmax()]
+    min_day = data.loc[data['Unique_Visits'].idxmin()]
+    return {
+        'start': start.date().isoformat(),
+        'end': end.date().isoformat(),
+        'max_date': max_day['Date'].date().isoformat(),
+        'max_visits': int(max_day['Unique_Visits']),
+        'min_date': min_day['Date'].date().isoformat(),
+        'min_visits': int(min_day['Unique_Visits']),
+        'avg_visits': int(data['Unique_Visits'].mean()),
+        'weekly_trend': float(weekly_mean.iloc[-1] - weekly_mean.iloc[-8]),
+        'best_day': by_day['mean'].idxmax(),
+        'best_month': by_month['mean'].idxmax(),
+        'median_visits': int(data['Unique_Visits'].median()),
+        'iqr_visits': int(data['Unique_Visits'].quantile(0.75) - data['Unique_Visits'].quantile(0.25)),
+        'lag1_autocorr': float(data['Unique_Visits'].autocorr()),
+        'most_dispersed_day': by_day['std'].idxmax()
+    }
+
+
+def heatmap_figure(data: pd.DataFrame, rollup: CalendarRollup):
+    # Average unique visits by day and month, read from the calendar rollup
+    # (rows are Monday..Sunday, shown abbreviated, and columns Jan..Dec; cells without data stay empty)
+    import plotly.graph_objects as go
+
+    pivot_table = rollup.cells('Unique_Visits', data.index[0], data.index[-1])['mean']
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=pivot_table.values,
+        x=pivot_table.columns,
+        y=[day[:3] for day in pivot_table.index],
+        colorscale=[[0, '#fcffff'], [0.1, '#bcfdff'], [0.2, '#9ddbf9'], [0.3, '#7bbbf2'], [0.4, '#509beb'], [0.6, '#2b7ed7'], [0.8, '#1f62b7'], [0.9, '#114898'], [1, '#002f7a']],
+        colorbar=dict(title='Unique Visits', bgcolor='rgba(252, 255, 255, 0)', tickcolor='#fdfefe', titlefont=dict(color='#fdfefe'))
+    ))
+    
+    fig.update_layout(
+        title='Heatmap: Unique Visits by Day of the Week and Month',
+        plot_bgcolor='rgba(252, 255, 255, 0)',
+        paper_bgcolor='rgba(252, 255, 255, 0)',
+        xaxis=dict(title='Month', titlefont=dict(color='#fdfefe'), tickfont=dict(color='#fdfefe')),
+        yaxis=dict(title='Day of the Week', titlefont=dict(color='#fdfefe'), tickfont=dict(color='#fdfefe'))
+    )
+    return fig
+
+def boxplot_figure(data: pd.DataFrame):
+    import plotly.express as px
+
+    # Change category names in the DataFrame
+    df_melt = data.melt(id_vars=['Date'], value_vars=['Unique_Visits', 'First_Time_Visits', 'Returning_Visits'], 
+                        var_name='Visit Type', value_name='Count')
+    
+    # Change category names
+    df_melt['Visit Type'] = df_melt['Visit Type'].replace({
+        'Unique_Visits': 'Unique Visits',
+        'First_Time_Visits': 'New User Visits',
+        'Returning_Visits': 'Returning User Visits'
+    })
+
+    fig = px.box(
+        df_melt,
+        x='Visit Type',
+        y='Count',
+        color='Visit Type',
+        color_discrete_sequence=['#002f7a', '#509beb', '#1f62b7'],
+        title='Distribution of Unique, First-Time, and Returning Visits'
+    )
+    fig.update_layout(
+        plot_bgcolor='rgba(252, 255, 255, 0)',
+        paper_bgcolor='rgba(252, 255, 255, 0)',
+        font_color='#fdfefe',
+        showlegend=False
+    )
+    
+    return fig
+
+def acf_pacf_figure(corr: dict, column: str = 'Unique_Visits'):
+    import plotly.graph_objects as go
+    import plotly.subplots as sp
+
+    acf_vals = corr['acf'][column].values
+    pacf_vals = corr['pacf'][column].values
+    lags = np.arange(len(acf_vals))
+    
+    # Create subplots
+    fig = sp.make_subplots(rows=1, cols=2, subplot_titles=('ACF', 'PACF'))
+    
+    # ACF subplot
+    fig.add_trace(go.Bar(
+        x=lags,
+        y=acf_vals,
+        name=' ',
+        marker_color='#002f7a'
+    ), row=1, col=1)
+    
+    # PACF subplot
+    fig.add_trace(go.Bar(
+        x=lags,
+        y=pacf_vals,
+        name=' ',
+        marker_color='#509beb'
+    ), row=1, col=2)
+    
+    # Layout with two subplots
+    fig.update_layout(
+        title='Autocorrelation Function (ACF) and Partial (PACF)',
+        plot_bgcolor='rgba(252, 255, 255, 0)',
+        paper_bgcolor='rgba(252, 255, 255, 0)',
+        font_color='#fdfefe',
+        showlegend=False,
+        margin=dict(l=70, r=70, t=70, b=50)  # margin to avoid cutting labels
+    )
+    
+    # Adjust axes
+    fig.update_xaxes(title='Lag', title_font=dict(size=14), tickfont=dict(size=12), row=1, col=1)
+    fig.update_yaxes(title='ACF', title_font=dict(size=14), tickfont=dict(size=12), autorange=True, title_standoff=10, ticks='outside', ticklen=5, row=1, col=1)
+    
+    fig.update_xaxes(title='Lag', title_font=dict(size=14), tickfont=dict(size=12), row=1, col=2)
+    fig.update_yaxes(title='PACF', title_font=dict(size=14), tickfont=dict(size=12), autorange=True, title_standoff=10, ticks='outside', ticklen=5, row=1, col=2)
+    
+    return fig
+
+def distribution_kde_figure(data: pd.DataFrame):
+    import plotly.express as px
+
+    fig = px.histogram(
+        data,
+        x='Unique_Visits',
+        nbins=30,
+        marginal='rug',
+        histnorm='density',
+        title='Distribution and KDE of Unique Visits',
+        color_discrete_sequence=['#1f62b7']
+    )
+    fig.update_layout(
+        plot_bgcolor='rgba(252, 255, 255, 0)',
+        paper_bgcolor='rgba(252, 255, 255, 0)',
+        font_color='#fdfefe'
+    )
+    return fig
+
+def violin_figure(data: pd.DataFrame):
+    # Every observation is only shipped to the browser for small ranges
+    import plotly.express as px
+
+    points = 'all' if len(data) <= WEBGL_THRESHOLD else 'outliers'
+    fig = px.violin(
+        sample_per_group(data[['Day', 'Unique_Visits']], 'Day'),
+        x='Day',
+        y='Unique_Visits',
+        labels={'Unique_Visits': 'Unique Visits', 'Day': 'Date'},
+        box=True,
+        points=points,
+        color='Day',
+        title='Distribution of Unique Visits by Day of the Week (Violin Plot)',
+        color_discrete_sequence=['#002f7a', '#114898', '#1f62b7', '#2b7ed7', '#509beb', '#7bbbf2', '#9ddbf9']
+    )
+    fig.update_layout(
+        template='plotly_white',
+        plot_bgcolor='rgba(252, 255, 255, 0)',
+        paper_bgcolor='rgba(252, 255, 255, 0)',
+        font_color='#fdfefe',
+        showlegend=False
+    )
+    return fig
+
+def moving_average_figure(data: pd.DataFrame, rolling: RollingStats, pyramid: ResolutionPyramid, window: int = 7):
+    import plotly.graph_objects as go
+
+    if len(data) <= LTTB_LIMIT:
+        if window in WINDOWS:
+            moving_avg = rolling.get('Unique_Visits', window, 'mean', data.index[0], data.index[-1]).values
+        else:
+            moving_avg = data['Unique_Visits'].rolling(window=window).mean()
+        df = data[['Unique_Visits']].assign(Moving_Avg=moving_avg)
+        # Keep about one point per pixel; LTTB preserves the peaks and dips
+        df = downsample(df, 'Unique_Visits')
+        title = f'Moving Average ({window} days) of Unique Visits'
+    else:
+        # Very long ranges are drawn from the pre-aggregated pyramid levels
+        level, df = pyramid.select(data.index[0], data.index[-1], column='Unique_Visits')
+        days_per_point = dict((label, days) for label, _, days in PYRAMID_LEVELS)[level]
+        df = df[['Unique_Visits']].assign(
+            Moving_Avg=df['Unique_Visits'].rolling(window=max(1, round(window / days_per_point))).mean()
+        )
+        title = f'Moving Average ({window} days) of Unique Visits ({level} means)'
+
+    fig = go.Figure([
+        line_trace(df.index, df['Unique_Visits'], 'Unique_Visits', '#002f7a'),
+        line_trace(df.index, df['Moving_Avg'], 'Moving_Avg', '#509beb')
+    ])
+    fig.update_layout(
+        title=title,
+        xaxis_title='Date',
+        yaxis_title='Count',
+        legend_title='Metric',
+        plot_bgcolor='rgba(252, 255, 255, 0)',
+        paper_bgcolor='rgba(252, 255, 255, 0)',
+        font_color='#fdfefe',
+        legend=dict(bgcolor='rgba(252, 255, 255, 0)', bordercolor='#fdfefe', borderwidth=1),
+    )
+    return fig
+
+def anomaly_figure(data: pd.DataFrame, anomalies: AnomalyTrack, pyramid: ResolutionPyramid,
+                   threshold: float = THRESHOLD, metrics=COUNT_COLUMNS):
+    # Each metric drawn like the other line charts, with the days flagged against their
+    # weekday baseline as markers on top
+    import plotly.graph_objects as go
+
+    flagged = anomalies.flagged(data, threshold, metrics)
+    # One level and point selection shared by every line (the first metric picks the rows)
+    _, df = pyramid.select(data.index[0], data.index[-1], column=metrics[0])
+    fig = go.Figure()
+    for col, color in zip(metrics, ['#002f7a', '#509beb', '#1f62b7', '#7bbbf2']):
+        fig.add_trace(line_trace(df.index, df[col], col, color, legendgroup=col))
+        points = flagged[flagged['Metric'] == col]
+        fig.add_trace(go.Scatter(
+            x=points['Date'], y=points['Value'], name=f'{col} anomalies', legendgroup=col, mode='markers',
+            marker=dict(color='#ff4b4b', size=9, line=dict(color=color, width=2)),
+            customdata=points[['Expected', 'Z']].to_numpy(),
+            hovertemplate='%{x|%Y-%m-%d}: %{y:,}<br>expected %{customdata[0]:,.0f} (z = %{customdata[1]:.1f})'
+        ))
+    fig.update_layout(
+        title=f'Anomalies (|z| > {threshold:g} against the day-of-week baseline)',
+        xaxis_title='Date',
+        yaxis_title='Count',
+        legend_title='Metric',
+        plot_bgcolor='rgba(252, 255, 255, 0)',
+        paper_bgcolor='rgba(252, 255, 255, 0)',
+        font_color='#fdfefe',
+        legend=dict(bgcolor='rgba(252, 255, 255, 0)', bordercolor='#fdfefe', borderwidth=1),
+    )
+    return fig
+
+def backtest_figure(result: dict, title: str):
+    # Mean absolute percentage error by days ahead and by day of the week of the forecast day
+    import plotly.graph_objects as go
+    import plotly.subplots as sp
+
+    fig = sp.make_subplots(rows=1, cols=2, subplot_titles=('By Days Ahead', 'By Day of the Week'))
+    horizon, weekday = result['horizon'], result['weekday']
+    fig.add_trace(go.Scatter(
+        x=horizon.index, y=horizon['MAPE'], mode='lines+markers', line=dict(color='#509beb'),
+        customdata=horizon['MAE'], hovertemplate='%{x} days ahead: %{y:.1f}%<br>MAE %{customdata:,.0f}<extra></extra>'
+    ), row=1, col=1)
+    fig.add_trace(go.Bar(
+        x=weekday.index, y=weekday['MAPE'], marker_color='#002f7a',
+        customdata=weekday['MAE'], hovertemplate='%{x}: %{y:.1f}%<br>MAE %{customdata:,.0f}<extra></extra>'
+    ), row=1, col=2)
+    fig.update_layout(
+        title=title,
+        plot_bgcolor='rgba(252, 255, 255, 0)',
+        paper_bgcolor='rgba(252, 255, 255, 0)',
+        font_color='#fdfefe',
+        showlegend=False,
+        margin=dict(l=70, r=70, t=70, b=50)
+    )
+    fig.update_xaxes(title='Days ahead', row=1, col=1)
+    fig.update_yaxes(title='MAPE (%)', rangemode='tozero', row=1, col=1)
+    fig.update_yaxes(title='MAPE (%)', rangemode='tozero', row=1, col=2)
+    return fig
+
+def forecast_figure(forecasts: dict, days: int):
+    # forecasts: {series: mean forecast per weekday, Monday to Sunday}
+    import plotly.graph_objects as go
+
+    categories = DAYS_ORDER
+
+    fig = go.Figure()
+
+    for col, color in zip(forecasts, ['#002f7a', '#509beb', '#1f62b7', '#7bbbf2']):
+        values = list(forecasts[col])
+        values.append(values[0])  # close polygon
+        fig.add_trace(go.Scatterpolar(
+            r=values,
+            theta=categories + [categories[0]],
+            fill='toself',
+            name=col.replace('_', ' '),
+            line=dict(color=color)
+        ))
+
+    fig.update_layout(
+        polar=dict(
+            bgcolor='rgba(252, 255, 255, 0)',
+            radialaxis=dict(
+                visible=True,
+                color='#fdfefe',
+                gridcolor='#7bbbf2'
+            ),
+            angularaxis=dict(
+                tickfont=dict(color='#fdfefe')
+            )
+        ),
+        plot_bgcolor='rgba(252, 255, 255, 0)',
+        paper_bgcolor='rgba(252, 255, 255, 0)',
+        font_color='#fdfefe',
+        title=f'Radar Forecast by Day of the Week - Next {days} Days',
+        legend=dict(bgcolor='rgba(252, 255, 255, 0)', bordercolor='#fdfefe', borderwidth=1),
+        margin=dict(l=50, r=50, t=70, b=50),
+        height=500,
+        hovermode='closest'
+    )
+
+    return fig
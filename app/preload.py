@@ -0,0 +1,37 @@
+import importlib
+import threading
+
+# Modules the panels import on first use, warmed up in the background once the first widgets
+# are on screen so the forecast and chart panels do not pay for them on the first request
+PRELOAD_MODULES = ('statsmodels.tsa.arima.model', 'plotly.graph_objects', 'plotly.express', 'plotly.subplots')
+
+_lock = threading.Lock()
+_thread = None
+
+
+def _import_all(modules):
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            # The panel that needs it reports the error when it renders
+            pass
+
+
+def start(modules=PRELOAD_MODULES) -> threading.Thread:
+    # Starts the preload once per process; later calls return the same thread
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_import_all, args=(tuple(modules),), name='preload', daemon=True)
+            _thread.start()
+        return _thread
+
+
+def wait(timeout: float = None):
+    # Blocks until a started preload has finished. Forking while another thread is in the
+    # middle of an import would leave the child with that module's import lock held.
+    with _lock:
+        thread = _thread
+    if thread is not None:
+        thread.join(timeout)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from incremental import Incremental
+
+# Above this many points a trace is drawn with WebGL instead of SVG
+WEBGL_THRESHOLD = 1000
+# Points kept per line trace, roughly one per horizontal pixel of a wide chart
+PIXEL_BUDGET = 1500
+# Markers are only drawn on lines with at most this many points
+MARKER_THRESHOLD = 400
+# Daily ranges are downsampled with LTTB while that keeps at least every other day; longer
+# ones (over about 8 years) are served from the weekly and monthly levels instead
+LTTB_LIMIT = 2 * PIXEL_BUDGET
+# Raw observations shipped per category in distribution plots
+SAMPLE_PER_GROUP = 1000
+
+# Resolution pyramid levels, finest first: (label, resample rule, approximate days per point)
+PYRAMID_LEVELS = [('daily', None, 1), ('weekly', 'W-SUN', 7), ('monthly', 'MS', 30)]
+# Period of each resample rule, to find the bucket a day falls in
+RULE_PERIODS = {'W-SUN': 'W-SUN', 'MS': 'M'}
+
+
+def lttb(x, y, n_out: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: indices of n_out points that keep the visual shape of (x, y)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket is the third vertex of the triangle
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = np.nanmean(y[hi:next_hi]) if np.isfinite(y[hi:next_hi]).any() else 0.0
+        area = np.abs((x[previous] - avg_x) * (y[lo:hi] - y[previous]) - (x[previous] - x[lo:hi]) * (avg_y - y[previous]))
+        previous = lo + (int(np.nanargmax(area)) if np.isfinite(area).any() else 0)
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample(df: pd.DataFrame, column: str, budget: int = PIXEL_BUDGET) -> pd.DataFrame:
+    # Rows of df chosen by LTTB on `column`; other columns follow the same rows
+    if len(df) <= budget:
+        return df
+    x = df.index.asi8 if isinstance(df.index, pd.DatetimeIndex) else np.arange(len(df))
+    return df.iloc[lttb(x, df[column].to_numpy(dtype=np.float64), budget)]
+
+
+class ResolutionPyramid(Incremental):
+    # Daily data plus weekly and monthly means, built once per data version.
+    # A range is served from the finest level that fits the point budget.
+
+    def __init__(self, data: pd.DataFrame, columns):
+        self.columns = list(columns)
+        self.index = pd.DatetimeIndex(data.index)
+        daily = data[self.columns].astype(np.float64)
+        self.levels = {}
+        for label, rule, _ in PYRAMID_LEVELS:
+            self.levels[label] = daily if rule is None else daily.resample(rule).mean()
+
+    def _extend(self, data: pd.DataFrame, n: int) -> dict:
+        # Each level only recomputes its last bucket, which the new days may complete, and the
+        # buckets after it
+        daily = pd.concat([self.levels['daily'], data.iloc[n:][self.columns].astype(np.float64)])
+        levels = {}
+        for label, rule, _ in PYRAMID_LEVELS:
+            if rule is None:
+                levels[label] = daily
+                continue
+            bucket_start = self.index[-1].to_period(RULE_PERIODS[rule]).start_time
+            tail = daily[daily.index >= bucket_start].resample(rule).mean()
+            levels[label] = pd.concat([self.levels[label].iloc[:-1], tail])
+        return {'levels': levels}
+
+    def select(self, start, end, budget: int = PIXEL_BUDGET, column: str = None) -> tuple:
+        # (level label, frame) for the date range, at most `budget` points per column
+        for label, _, _ in PYRAMID_LEVELS:
+            frame = self.levels[label].loc[start:end]
+            if len(frame) <= budget:
+                return label, frame
+            if label == 'daily' and len(frame) <= LTTB_LIMIT and column is not None:
+                return label, downsample(frame, column, budget)
+        return label, downsample(frame, column or frame.columns[0], budget)
+
+
+def line_trace(x, y, name: str, color: str, **kwargs):
+    # SVG for small traces, WebGL once the point count would make SVG slow
+    import plotly.graph_objects as go
+
+    n = len(y)
+    trace = go.Scattergl if n > WEBGL_THRESHOLD else go.Scatter
+    mode = 'lines+markers' if n <= MARKER_THRESHOLD else 'lines'
+    return trace(x=x, y=y, name=name, mode=mode, line=dict(color=color), **kwargs)
+
+
+def sample_per_group(df: pd.DataFrame, column: str, size: int = SAMPLE_PER_GROUP) -> pd.DataFrame:
+    # Bounded, reproducible sample of each category so distribution payloads stay small
+    if df[column].value_counts().max() <= size:
+        return df
+    return df.groupby(column, group_keys=False, sort=False).apply(
+        lambda group: group.sample(n=min(size, len(group)), random_state=0)
+    )
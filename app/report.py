@@ -0,0 +1,180 @@
+"""Render every dashboard panel and the insight values to static HTML/JSON.
+
+Example, two date ranges of the bundled dataset with four worker processes:
+
+    python app/report.py --range 2016-01-01:2016-12-31 --range 2019-01-01:2019-12-31 --workers 4
+
+Output goes to <out>/<site>/<start>_<end>/: one <panel>.json per figure, insights.json,
+and report.html with every panel. The site name is the stem of each --source file, prefixed with
+its folder when two sources share a stem (a/x.csv and b/x.csv become a/x and b/x).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from plotly.offline import get_plotlyjs_version
+
+from datastore import COUNT_COLUMNS, DATASET_PATH, load_sites, select_date_range, site_names, site_view
+from fast_forecast import ENGINE_LABELS
+from panels import (
+    acf_pacf_figure,
+    anomaly_figure,
+    boxplot_figure,
+    compute_insights,
+    correlogram_frames,
+    forecast_figure,
+    heatmap_figure,
+    moving_average_figure,
+    violin_figure,
+    weekday_forecasts
+)
+from anomalies import AnomalyTrack
+from rendering import ResolutionPyramid
+from rolling import RollingStats
+from rollup import CalendarRollup
+
+PANELS = ['heatmap', 'boxplot', 'acf_pacf', 'violin', 'moving_average', 'anomalies', 'forecast']
+FORECAST_SERIES = ('First_Time_Visits', 'Returning_Visits')
+
+# Per-process data and aggregates, built the first time a worker sees a source
+_CONTEXTS = {}
+
+
+def _context(source: str) -> dict:
+    if source not in _CONTEXTS:
+        data = site_view(load_sites([source]))
+        _CONTEXTS[source] = {
+            'data': data,
+            'rollup': CalendarRollup(data),
+            'rolling': RollingStats(data),
+            'pyramid': ResolutionPyramid(data, COUNT_COLUMNS),
+            'anomalies': AnomalyTrack(data)
+        }
+    return _CONTEXTS[source]
+
+
+def build_panel(source: str, start, end, panel: str, days: int = 30, nlags: int = 30, engine: str = 'arima'):
+    ctx = _context(source)
+    data = select_date_range(ctx['data'], start, end)
+    if panel == 'heatmap':
+        return heatmap_figure(data, ctx['rollup'])
+    if panel == 'boxplot':
+        return boxplot_figure(data)
+    if panel == 'acf_pacf':
+        return acf_pacf_figure(correlogram_frames(data, nlags))
+    if panel == 'violin':
+        return violin_figure(data)
+    if panel == 'moving_average':
+        return moving_average_figure(data, ctx['rolling'], ctx['pyramid'])
+    if panel == 'anomalies':
+        return anomaly_figure(data, ctx['anomalies'], ctx['pyramid'])
+    if panel == 'forecast':
+        return forecast_figure(weekday_forecasts(data, days, FORECAST_SERIES, engine=engine), days)
+    raise ValueError(f'Unknown panel: {panel}')
+
+
+def render_job(source: str, start, end, panel: str, out_dir: str, days: int, nlags: int, engine: str = 'arima') -> tuple:
+    # Worker entry point: writes <panel>.json and returns the panel's HTML fragment
+    warnings.filterwarnings('ignore')
+    began = time.perf_counter()
+    if panel == 'insights':
+        ctx = _context(source)
+        insights = compute_insights(select_date_range(ctx['data'], start, end), ctx['rollup'], ctx['rolling'])
+        with open(os.path.join(out_dir, 'insights.json'), 'w') as fh:
+            json.dump(insights, fh, indent=2)
+        return panel, insights, time.perf_counter() - began
+    fig = build_panel(source, start, end, panel, days, nlags, engine)
+    with open(os.path.join(out_dir, panel + '.json'), 'w') as fh:
+        fh.write(fig.to_json())
+    return panel, fig.to_html(full_html=False, include_plotlyjs=False), time.perf_counter() - began
+
+
+def _write_report(out_dir: str, title: str, fragments: dict, insights: dict):
+    rows = ''.join(f'<tr><th>{key}</th><td>{value}</td></tr>' for key, value in insights.items())
+    panels = ''.join(f'<section>{fragments[panel]}</section>' for panel in PANELS if panel in fragments)
+    with open(os.path.join(out_dir, 'report.html'), 'w') as fh:
+        fh.write(f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    <script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>
+    <style>
+        body {{ font-family: sans-serif; color: #fcffff; background-image: linear-gradient(to top, #09203f 0%, #537895 100%); }}
+        table {{ background: rgba(255,255,255,0.85); color: #1c2833; border-radius: 10px; padding: 8px; }}
+        th {{ text-align: left; padding-right: 16px; }}
+    </style>
+</head>
+<body>
+    <h1>{title}</h1>
+    <table>{rows}</table>
+    {panels}
+</body>
+</html>
+""")
+
+
+def parse_range(value: str) -> tuple:
+    start, _, end = value.partition(':')
+    if not end:
+        raise argparse.ArgumentTypeError('ranges are written START:END, e.g. 2016-01-01:2016-12-31')
+    return pd.Timestamp(start), pd.Timestamp(end)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', action='append', help='CSV export, one per site (default: the bundled dataset)')
+    parser.add_argument('--range', action='append', type=parse_range, dest='ranges',
+                        help='date range START:END; repeat for several ranges (default: all data)')
+    parser.add_argument('--panel', action='append', choices=PANELS, dest='panels', help='panels to render (default: all)')
+    parser.add_argument('--days', type=int, default=30, help='forecast horizon in days')
+    parser.add_argument('--engine', choices=list(ENGINE_LABELS), default='arima', help='forecast model')
+    parser.add_argument('--nlags', type=int, default=30, help='lags in the ACF/PACF panel')
+    parser.add_argument('--out', default='reports', help='output directory')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    sources = [os.path.abspath(path) for path in (args.source or [DATASET_PATH])]
+    panels = (args.panels or PANELS) + ['insights']
+    jobs = []
+    # Named like the dashboard names them, so two files called x.csv get separate folders
+    for source, site in zip(sources, site_names(sources)):
+        for start, end in (args.ranges or [(pd.Timestamp.min, pd.Timestamp.max)]):
+            if start > end:
+                parser.error(f'range start {start.date()} is after its end {end.date()}')
+            data = select_date_range(site_view(load_sites([source])), start, end)
+            if data.empty:
+                print(f'{site}: no data between {start.date()} and {end.date()}, skipped', file=sys.stderr)
+                continue
+            # Name the folder after the data actually covered, so open-ended ranges are readable
+            start, end = data.index[0], data.index[-1]
+            out_dir = os.path.join(args.out, site, f'{start.date()}_{end.date()}')
+            os.makedirs(out_dir, exist_ok=True)
+            jobs += [(source, start, end, panel, out_dir) for panel in panels]
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(render_job, source, start, end, panel, out_dir, args.days, args.nlags, args.engine): (source, out_dir)
+            for source, start, end, panel, out_dir in jobs
+        }
+        for future in as_completed(futures):
+            source, out_dir = futures[future]
+            panel, output, seconds = future.result()
+            results.setdefault(out_dir, {})[panel] = output
+            print(f'{out_dir}: {panel} ({seconds:.2f}s)')
+
+    for out_dir, outputs in results.items():
+        insights = outputs.pop('insights')
+        site, span = out_dir.split(os.sep)[-2:]
+        _write_report(out_dir, f'Web Traffic Report - {site} - {span.replace("_", " to ")}', outputs, insights)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from datastore import COUNT_COLUMNS
+from incremental import Incremental
+
+WINDOWS = (7, 28, 90)
+STATS = ('mean', 'std', 'min', 'max')
+
+
+def rolling_stats(values, windows=WINDOWS) -> dict:
+    # {(window, stat): array (n, metrics)} for trailing windows, NaN until a window is full.
+    # Sums come from one integer cumulative sum, so means and variances are exact.
+    values = np.asarray(values)
+    n, m = values.shape
+    ints = values.astype(np.int64)
+    csum = np.zeros((n + 1, m), dtype=np.int64)
+    csq = np.zeros((n + 1, m), dtype=np.int64)
+    np.cumsum(ints, axis=0, out=csum[1:])
+    np.cumsum(ints * ints, axis=0, out=csq[1:])
+
+    out = {}
+    for w in windows:
+        shape = (n, m)
+        stats = {stat: np.full(shape, np.nan) for stat in STATS}
+        if w <= n:
+            total = csum[w:] - csum[:-w]
+            total_sq = csq[w:] - csq[:-w]
+            stats['mean'][w - 1:] = total / w
+            if w > 1:
+                # Sample variance (ddof=1) like pandas' rolling().std()
+                stats['std'][w - 1:] = np.sqrt((w * total_sq - total * total) / (w * (w - 1)))
+            windows_view = sliding_window_view(values, w, axis=0)
+            stats['min'][w - 1:] = windows_view.min(axis=-1)
+            stats['max'][w - 1:] = windows_view.max(axis=-1)
+        for stat in STATS:
+            out[(w, stat)] = stats[stat]
+    return out
+
+
+class RollingStats(Incremental):
+    # Rolling mean/std/min/max of every metric and window, computed once per data version.
+    # Panels read a date range; the first window-1 days of the range are left empty so the
+    # values match a rolling window computed on the selected range alone.
+
+    def __init__(self, data: pd.DataFrame, metrics=COUNT_COLUMNS, windows=WINDOWS):
+        self.metrics = list(metrics)
+        self.windows = tuple(windows)
+        self.index = pd.DatetimeIndex(data.index)
+        self._stats = rolling_stats(data[self.metrics].to_numpy(), self.windows)
+
+    def _extend(self, data: pd.DataFrame, n: int) -> dict:
+        # Only the windows ending on new rows are computed, from the new rows and the
+        # max(window) - 1 rows before them
+        added = len(data) - n
+        tail = data[self.metrics].to_numpy()[-(added + max(self.windows) - 1):]
+        stats = rolling_stats(tail, self.windows)
+        return {'_stats': {key: np.concatenate([values, stats[key][len(tail) - added:]]) for key, values in self._stats.items()}}
+
+    def get(self, metric: str, window: int, stat: str = 'mean', start=None, end=None) -> pd.Series:
+        lo = 0 if start is None else self.index.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(self.index) if end is None else self.index.searchsorted(pd.Timestamp(end), side='right')
+        values = self._stats[(window, stat)][lo:hi, self.metrics.index(metric)].copy()
+        values[:window - 1] = np.nan
+        return pd.Series(values, index=self.index[lo:hi], name=f'{metric}_{stat}_{window}')
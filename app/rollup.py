@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from datastore import COUNT_COLUMNS, DAYS_ORDER, MONTH_NAMES
+from incremental import Incremental
+
+# (day of week, month) cells, weekday-major
+CELLS = 7 * 12
+
+
+class CalendarRollup(Incremental):
+    # Running sums of every metric within each (day of week, month) cell, over that cell's rows
+    # only, so memory stays linear in the rows. Sums of any date range are two binary searches
+    # and a subtraction per cell, whatever its length.
+
+    def __init__(self, data: pd.DataFrame, metrics=COUNT_COLUMNS):
+        self.metrics = list(metrics)
+        self.index = pd.DatetimeIndex(data.index)
+        cells = self._cells(data)
+        order = np.argsort(cells, kind='stable')
+        bounds = np.searchsorted(cells[order], np.arange(CELLS + 1))
+        values = data[self.metrics].to_numpy(dtype=np.int64)[order]
+        # Per cell: row positions in date order, and sums and sums of squares up to each of them.
+        # Row 0 of the sums is the empty prefix; integer sums keep the variance exact.
+        self.positions = [order[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+        self.total = [self._prefix(values[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        self.total_sq = [self._prefix(values[lo:hi] ** 2) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    @staticmethod
+    def _cells(data: pd.DataFrame) -> np.ndarray:
+        # Weekday and month come precomputed as categorical codes (Sunday and January are 0)
+        weekday = (data['Day'].cat.codes.to_numpy().astype(np.int64) + 6) % 7
+        return weekday * 12 + data['Month'].cat.codes.to_numpy()
+
+    @staticmethod
+    def _prefix(values: np.ndarray, last=None) -> np.ndarray:
+        sums = np.zeros((len(values) + 1, values.shape[1]), dtype=np.int64)
+        if last is not None:
+            sums[0] = last
+        np.cumsum(values, axis=0, out=sums[1:])
+        sums[1:] += sums[0]
+        return sums
+
+    def _extend(self, data: pd.DataFrame, n: int) -> dict:
+        # Only the cells of the new rows change; their positions and running sums are appended to
+        added = data.iloc[n:]
+        positions, total, total_sq = list(self.positions), list(self.total), list(self.total_sq)
+        cells = self._cells(added)
+        values = added[self.metrics].to_numpy(dtype=np.int64)
+        for cell in np.unique(cells):
+            rows = np.flatnonzero(cells == cell)
+            positions[cell] = np.concatenate([self.positions[cell], n + rows])
+            total[cell] = np.concatenate([self.total[cell], self._prefix(values[rows], self.total[cell][-1])[1:]])
+            total_sq[cell] = np.concatenate([self.total_sq[cell], self._prefix(values[rows] ** 2, self.total_sq[cell][-1])[1:]])
+        return {'positions': positions, 'total': total, 'total_sq': total_sq}
+
+    def sums(self, metric: str, start, end):
+        # Count, sum and sum of squares per cell, shaped (7 days, 12 months)
+        lo = self.index.searchsorted(pd.Timestamp(start), side='left')
+        hi = self.index.searchsorted(pd.Timestamp(end), side='right')
+        k = self.metrics.index(metric)
+        count, total, total_sq = (np.zeros(CELLS, dtype=np.int64) for _ in range(3))
+        for cell, positions in enumerate(self.positions):
+            a, b = np.searchsorted(positions, (lo, hi))
+            count[cell] = b - a
+            total[cell] = self.total[cell][b, k] - self.total[cell][a, k]
+            total_sq[cell] = self.total_sq[cell][b, k] - self.total_sq[cell][a, k]
+        return count.reshape(7, 12), total.reshape(7, 12), total_sq.reshape(7, 12)
+
+    @staticmethod
+    def _stats(count, total, total_sq):
+        count = count.astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            # Sample standard deviation, same as pandas' default ddof=1
+            var = (total_sq - total * mean) / (count - 1)
+            std = np.sqrt(np.where(count > 1, np.maximum(var, 0), np.nan))
+        return count, np.where(count > 0, mean, np.nan), std
+
+    def cells(self, metric: str, start, end) -> dict:
+        count, mean, std = self._stats(*self.sums(metric, start, end))
+        frame = lambda values: pd.DataFrame(values, index=DAYS_ORDER, columns=MONTH_NAMES)
+        return {'count': frame(count), 'mean': frame(mean), 'std': frame(std)}
+
+    def by_day(self, metric: str, start, end) -> pd.DataFrame:
+        count, total, total_sq = (a.sum(axis=1) for a in self.sums(metric, start, end))
+        count, mean, std = self._stats(count, total, total_sq)
+        return pd.DataFrame({'count': count, 'mean': mean, 'std': std}, index=DAYS_ORDER)
+
+    def by_month(self, metric: str, start, end) -> pd.DataFrame:
+        count, total, total_sq = (a.sum(axis=0) for a in self.sums(metric, start, end))
+        count, mean, std = self._stats(count, total, total_sq)
+        return pd.DataFrame({'count': count, 'mean': mean, 'std': std}, index=MONTH_NAMES)
@@ -0,0 +1,172 @@
+import functools
+import glob
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# Default size limit and lifetime of the entries
+MAX_BYTES = 512 * 1024 * 1024
+TTL_SECONDS = 24 * 3600
+# Seconds a process may hold the right to compute a key before others stop waiting for it
+CLAIM_SECONDS = 120
+# How often a process waiting on another one's computation checks for the result
+POLL_SECONDS = 0.05
+# Libraries whose objects end up in entries (pickled fits, figure JSON)
+VERSIONED_PACKAGES = ('numpy', 'pandas', 'statsmodels', 'plotly')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS claims (
+    key TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    # Identifies the release that writes an entry: the app's sources and the versions of the
+    # libraries it pickles, so replicas running different code never read each other's entries
+    import importlib.metadata  # only needed once a key is made, not before the first widget
+
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(path, 'rb') as fh:
+            digest.update(fh.read())
+    for name in VERSIONED_PACKAGES:
+        try:
+            digest.update(f'{name}=={importlib.metadata.version(name)}'.encode())
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    return digest.hexdigest()[:16]
+
+
+def cache_key(*parts) -> str:
+    # Stable key for a namespace, content digests and parameters, scoped to this release
+    return hashlib.sha256(json.dumps([code_version(), *parts], sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SharedCache:
+    # Computed results shared by every process that opens the same SQLite file, e.g. several
+    # Streamlit replicas on one host (a file on /dev/shm keeps it in shared memory). Entries expire
+    # after `ttl` seconds and the least recently read ones are evicted beyond `max_bytes`.
+    # get_or_compute() lets one process compute a missing key while the others wait for it.
+
+    def __init__(self, path: str, max_bytes: int = MAX_BYTES, ttl: float = TTL_SECONDS, claim_seconds: float = CLAIM_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.claim_seconds = claim_seconds
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.evictions = 0
+        self._counter_lock = threading.Lock()
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread (and per process, since a forked child must not reuse its parent's)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _count(self, name: str):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key: str):
+        # Stored bytes, or None when missing or expired
+        conn, now = self._connection(), time.time()
+        row = conn.execute('SELECT value, created FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None or row[1] < now - self.ttl:
+            return None
+        conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+        return row[0]
+
+    def put(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        conn, now = self._connection(), time.time()
+        conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)', (key, value, len(value), now, now))
+        self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        expired = conn.execute('DELETE FROM entries WHERE created < ?', (now - self.ttl,)).rowcount
+        excess = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0] - self.max_bytes
+        victims = []
+        if excess > 0:
+            for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed').fetchall():
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany('DELETE FROM entries WHERE key = ?', victims)
+        with self._counter_lock:
+            self.evictions += expired + len(victims)
+
+    def _claim(self, key: str) -> bool:
+        # True when this process now holds the right to compute `key`; the insert is the atomic step
+        conn, now = self._connection(), time.time()
+        conn.execute('DELETE FROM claims WHERE key = ? AND expires < ?', (key, now))
+        return conn.execute('INSERT OR IGNORE INTO claims VALUES (?, ?)', (key, now + self.claim_seconds)).rowcount == 1
+
+    def _release(self, key: str):
+        self._connection().execute('DELETE FROM claims WHERE key = ?', (key,))
+
+    def get_or_compute(self, key: str, compute, dumps=pickle.dumps, loads=pickle.loads):
+        # The cached value of `key`, computed at most once across processes while a claim holds
+        waited = False
+        while True:
+            value = self.get(key)
+            if value is not None:
+                self._count('hits')
+                return loads(value)
+            if self._claim(key):
+                break
+            # Another process is computing it; its claim expires if it dies
+            if not waited:
+                self._count('waits')
+                waited = True
+            time.sleep(POLL_SECONDS)
+        self._count('misses')
+        try:
+            result = compute()
+            # None means nothing could be computed (e.g. a timeout), which is not worth keeping
+            if result is not None:
+                self.put(key, dumps(result))
+            return result
+        finally:
+            self._release(key)
+
+    def load(self, key: str, loads=pickle.loads):
+        # Value of `key` if present, without computing or waiting
+        value = self.get(key)
+        self._count('misses' if value is None else 'hits')
+        return None if value is None else loads(value)
+
+    def store(self, key: str, value, dumps=pickle.dumps):
+        self.put(key, dumps(value))
+
+    def stats(self) -> dict:
+        conn = self._connection()
+        entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'waits': self.waits, 'evictions': self.evictions,
+                'entries': entries, 'bytes': size}
@@ -0,0 +1,174 @@
+import hashlib
+import importlib.util
+import io
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from datastore import COUNT_COLUMNS
+from incremental import Incremental
+
+# Columns of the data table and export, with their display names
+TABLE_COLUMNS = {
+    'Day': 'Day',
+    'Day_Of_Week': 'Day of the Week',
+    'Date': 'Date',
+    'Page_Loads': 'Page Loads',
+    'Unique_Visits': 'Unique Visits',
+    'First_Time_Visits': 'First Time Visits',
+    'Returning_Visits': 'Returning Visits',
+    'Month': 'Month'
+}
+SORT_COLUMNS = ['Date', 'Day', 'Month'] + COUNT_COLUMNS
+PAGE_SIZES = [25, 50, 100, 250]
+# Rows serialized at a time by the exports; bounds their memory whatever the selection size
+EXPORT_CHUNK_ROWS = 50_000
+EXPORT_FORMATS = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+
+
+class TableIndex(Incremental):
+    # Stable sort order of every sortable column over the full data, built once per data version.
+    # A query walks one precomputed order and keeps the rows of the range that pass the filters,
+    # so sorting and filtering cost one linear pass per rerun and no rows are copied.
+
+    def __init__(self, data: pd.DataFrame):
+        self.index = pd.DatetimeIndex(data.index)
+        self._keys = self._sort_keys(data)
+        self._order = {col: np.argsort(values, kind='mergesort') for col, values in self._keys.items()}
+
+    @staticmethod
+    def _sort_keys(data: pd.DataFrame) -> dict:
+        # Day and Month sort by their codes (calendar order), Date by position since rows are sorted
+        keys = {'Date': np.arange(len(data)), 'Day': data['Day'].cat.codes.to_numpy(), 'Month': data['Month'].cat.codes.to_numpy()}
+        return {col: keys[col] if col in keys else data[col].to_numpy() for col in SORT_COLUMNS}
+
+    def _extend(self, data: pd.DataFrame, n: int) -> dict:
+        # The new rows are sorted on their own and merged into each existing order, which keeps
+        # its stable ordering
+        keys, orders = self._sort_keys(data), {}
+        for col, values in keys.items():
+            added = n + np.argsort(values[n:], kind='mergesort')
+            at = np.searchsorted(values[self._order[col]], values[added], side='right')
+            orders[col] = np.insert(self._order[col], at, added)
+        return {'_keys': keys, '_order': orders}
+
+    def rows(self, data: pd.DataFrame, start=None, end=None, days=(), months=(), column: str = None,
+             minimum=None, maximum=None, sort_by: str = 'Date', ascending: bool = True) -> np.ndarray:
+        # Positions in `data` of the matching rows, in display order
+        lo = 0 if start is None else self.index.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(self.index) if end is None else self.index.searchsorted(pd.Timestamp(end), side='right')
+        keep = np.zeros(len(self.index), dtype=bool)
+        keep[lo:hi] = True
+        if days:
+            keep &= np.isin(self._keys['Day'], data['Day'].cat.categories.get_indexer(list(days)))
+        if months:
+            keep &= np.isin(self._keys['Month'], data['Month'].cat.categories.get_indexer(list(months)))
+        if column is not None:
+            values = data[column].to_numpy()
+            if minimum is not None:
+                keep &= values >= minimum
+            if maximum is not None:
+                keep &= values <= maximum
+        order = self._order[sort_by] if ascending else self._order[sort_by][::-1]
+        return order[keep[order]]
+
+
+def page(data: pd.DataFrame, rows: np.ndarray, number: int, size: int) -> pd.DataFrame:
+    # Only the rows of one page are taken from the shared frame
+    return data.iloc[rows[number * size:(number + 1) * size]][list(TABLE_COLUMNS)].rename(columns=TABLE_COLUMNS, copy=False)
+
+
+def iter_csv(data: pd.DataFrame, rows: np.ndarray, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    # CSV bytes of the selected rows, one chunk at a time
+    for i in range(0, max(len(rows), 1), chunk_rows):
+        chunk = data.iloc[rows[i:i + chunk_rows]][list(TABLE_COLUMNS)]
+        yield chunk.to_csv(index=False, header=i == 0, date_format='%Y-%m-%d').encode()
+
+
+def iter_parquet(data: pd.DataFrame, rows: np.ndarray, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    # Parquet bytes of the selected rows, one row group per chunk; needs pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = io.BytesIO()
+    writer = None
+    for i in range(0, max(len(rows), 1), chunk_rows):
+        chunk = data.iloc[rows[i:i + chunk_rows]][list(TABLE_COLUMNS)]
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        yield _drain(sink)
+    writer.close()
+    yield _drain(sink)
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+EXPORTERS = {'csv': iter_csv}
+# Parquet is offered when pyarrow is installed
+if importlib.util.find_spec('pyarrow') is not None:
+    EXPORTERS['parquet'] = iter_parquet
+
+
+class ExportRegistry:
+    # Selections offered for download, by token. The same query always gets the same token,
+    # and only the most recent `maxsize` selections are kept.
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._exports = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, data: pd.DataFrame, rows: np.ndarray, query: dict) -> str:
+        token = hashlib.sha256(json.dumps(query, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        with self._lock:
+            self._exports[token] = (data, rows)
+            self._exports.move_to_end(token)
+            while len(self._exports) > self.maxsize:
+                self._exports.popitem(last=False)
+        return token
+
+    def get(self, token: str):
+        with self._lock:
+            return self._exports.get(token)
+
+
+def serve_exports(registry: ExportRegistry, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    # /export/<token>.csv and /export/<token>.parquet, streamed with chunked transfer encoding
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            name = self.path.rpartition('/export/')[2]
+            token, _, fmt = name.partition('.')
+            export = registry.get(token) if self.path.startswith('/export/') else None
+            if export is None or fmt not in EXPORTERS:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', EXPORT_FORMATS[fmt])
+            self.send_header('Content-Disposition', f'attachment; filename="web-traffic-{token}.{fmt}"')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in EXPORTERS[fmt](*export):
+                if chunk:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='export-server', daemon=True).start()
+    return server
@@ -0,0 +1,55 @@
+"""Check the FFT/Durbin-Levinson correlogram against statsmodels and time both.
+
+Run from the repository root:
+
+    python benchmarks/bench_correlogram.py --nlags 30 365 --tile 1 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import numpy as np
+from statsmodels.tsa.stattools import acf, pacf
+
+from correlogram import correlogram
+from datastore import COUNT_COLUMNS, load_store
+
+# Largest absolute difference accepted against statsmodels
+TOLERANCE = 1e-8
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nlags', type=int, nargs='+', default=[30, 365])
+    parser.add_argument('--tile', type=int, nargs='+', default=[1, 10],
+                        help='repeat the dataset this many times to lengthen the series')
+    args = parser.parse_args()
+
+    base = load_store()[COUNT_COLUMNS].to_numpy(dtype=np.float64).T
+    failed = False
+    print(f"{'length':>8} {'lags':>5} {'statsmodels (s)':>16} {'batch (s)':>10} {'speedup':>8} {'max |diff|':>11}")
+    for tile in args.tile:
+        values = np.tile(base, tile)
+        for nlags in args.nlags:
+            start = time.perf_counter()
+            expected_acf = np.array([acf(row, nlags=nlags, fft=False) for row in values])
+            expected_pacf = np.array([pacf(row, nlags=nlags, method='ywm') for row in values])
+            reference = time.perf_counter() - start
+
+            start = time.perf_counter()
+            got_acf, got_pacf = correlogram(values, nlags)
+            batch = time.perf_counter() - start
+
+            diff = max(np.max(np.abs(got_acf - expected_acf)), np.max(np.abs(got_pacf - expected_pacf)))
+            failed |= diff > TOLERANCE
+            print(f'{values.shape[1]:>8} {nlags:>5} {reference:>16.4f} {batch:>10.4f} '
+                  f'{reference / batch:>7.1f}x {diff:>11.2e}')
+    if failed:
+        sys.exit(f'correlogram differs from statsmodels by more than {TOLERANCE}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Accuracy and latency of the NumPy forecast engines against the ARIMA(5, 1, 0) path.
+
+Each engine forecasts the four metrics of the bundled dataset from several origins, ending
+--horizon days apart, and is scored on the following --horizon days: daily MAPE and the MAPE of
+the weekday means the radar chart shows. The batch run times each NumPy engine on a matrix
+of --series noisy copies of the metrics; the ARIMA figure is extrapolated from its
+per-series time. Run from the repository root:
+
+    python benchmarks/bench_forecast_engines.py --origins 8 --horizon 30 --series 4000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import numpy as np
+import pandas as pd
+
+from datastore import COUNT_COLUMNS, DATASET_PATH, load_sites, site_view
+from fast_forecast import ENGINE_LABELS, ENGINES, weekday_profile
+from forecasting import DEFAULT_ORDER, fit_arima
+
+
+def arima_matrix(history: pd.DataFrame, steps: int) -> np.ndarray:
+    return np.column_stack([np.asarray(fit_arima(history[col], DEFAULT_ORDER).forecast(steps)) for col in history])
+
+
+def _mape(forecast, actual) -> float:
+    return float(np.mean(np.abs(forecast - actual) / np.maximum(np.abs(actual), 1)) * 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--origins', type=int, default=8, help='forecast origins, --horizon days apart')
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--series', type=int, default=4000, help='series in the batch timing')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    data = site_view(load_sites([DATASET_PATH]))[COUNT_COLUMNS].astype(np.float64)
+    engines = ['arima'] + list(ENGINES)
+    scores = {engine: {'seconds': [], 'daily': [], 'weekday': []} for engine in engines}
+    for i in range(args.origins, 0, -1):
+        origin = len(data) - i * args.horizon
+        history, actual = data.iloc[:origin], data.to_numpy()[origin:origin + args.horizon]
+        actual_profile = weekday_profile(actual, history.index[-1])
+        for engine in engines:
+            start = time.perf_counter()
+            if engine == 'arima':
+                forecast = arima_matrix(history, args.horizon)
+            else:
+                forecast = ENGINES[engine](history.to_numpy(), args.horizon)
+            scores[engine]['seconds'].append(time.perf_counter() - start)
+            scores[engine]['daily'].append(_mape(forecast, actual))
+            scores[engine]['weekday'].append(_mape(weekday_profile(forecast, history.index[-1]), actual_profile))
+
+    print(f'{args.origins} origins, {args.horizon}-day horizon, {len(COUNT_COLUMNS)} series per fit')
+    print(f"{'engine':>18} {'fit (s)':>9} {'daily MAPE %':>13} {'weekday MAPE %':>15}")
+    for engine in engines:
+        s = scores[engine]
+        print(f"{ENGINE_LABELS[engine]:>18} {np.median(s['seconds']):>9.4f} {np.mean(s['daily']):>13.2f} "
+              f"{np.mean(s['weekday']):>15.2f}")
+
+    rng = np.random.default_rng(0)
+    values = data.to_numpy()
+    batch = np.tile(values, (1, -(-args.series // values.shape[1])))[:, :args.series]
+    batch = batch * rng.lognormal(0, 0.1, batch.shape)
+    arima_per_series = np.median(scores['arima']['seconds']) / len(COUNT_COLUMNS)
+    print(f'\n{args.series} series of {len(values)} days')
+    print(f"{'engine':>18} {'batch (s)':>10} {'per series (ms)':>16}")
+    print(f"{ENGINE_LABELS['arima']:>18} {arima_per_series * args.series:>10.1f} {arima_per_series * 1000:>16.3f}  (extrapolated)")
+    for engine, func in ENGINES.items():
+        start = time.perf_counter()
+        func(batch, args.horizon)
+        seconds = time.perf_counter() - start
+        print(f'{ENGINE_LABELS[engine]:>18} {seconds:>10.2f} {seconds / args.series * 1000:>16.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Latency of a filter-only ARIMA update against a full refit when new days arrive.
+
+Run from the repository root:
+
+    python benchmarks/bench_incremental_forecast.py --series Unique_Visits --new-rows 1 7 30
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+import numpy as np
+import pandas as pd
+
+from datastore import load_store
+from forecasting import DEFAULT_ORDER, ForecastState, fit_arima
+
+
+def _best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--series', default='Unique_Visits')
+    parser.add_argument('--new-rows', type=int, nargs='+', default=[1, 7, 30])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    df = load_store()
+    ts = df.set_index(pd.DatetimeIndex(df['Date'].values))[args.series]
+
+    print(f"{'new rows':>9} {'full refit (s)':>15} {'update (s)':>11} {'speedup':>8} {'max |diff| 30d':>15}")
+    for rows in args.new_rows:
+        history = ts.iloc[:-rows]
+        state = ForecastState(fit_arima(history, DEFAULT_ORDER), history, DEFAULT_ORDER)
+        refit_time, refit = _best_of(lambda: fit_arima(ts, DEFAULT_ORDER), args.repeat)
+        update_time, updated = _best_of(lambda: state.extend(ts, refit_every=0), args.repeat)
+        diff = np.max(np.abs(np.asarray(refit.forecast(30)) - updated.forecast(30)))
+        print(f'{rows:>9} {refit_time:>15.4f} {update_time:>11.4f} {refit_time / update_time:>7.1f}x {diff:>15.2f}')
+
+
+if __name__ == '__main__':
+    main()
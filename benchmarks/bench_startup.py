@@ -0,0 +1,116 @@
+"""Cold-start time of the dashboard: time to first widget and where import time goes.
+
+Each sample is a fresh interpreter that runs the app once with Streamlit's AppTest. It
+reports the app's own `first_widget` timing (from the top of main.py to the date pickers)
+and the whole first run. A separate interpreter started with -X importtime imports what
+main.py imports before its first widget and lists the slowest imports. That run is kept
+apart because the background preload would interleave its lines. Run from the repository root:
+
+    python benchmarks/bench_startup.py --repeat 3 --top 15
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT, 'app')
+# Modules worth tracking at any depth: heavy dependencies that should load late, if at all
+WATCHED = ('streamlit', 'pandas', 'plotly.express', 'plotly.subplots', 'statsmodels.tsa.arima.model', 'scipy')
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def child(timeout: float):
+    # Runs in the sampled interpreter; prints one JSON line
+    import time
+
+    began = time.perf_counter()
+    sys.path.insert(0, APP_DIR)
+    from streamlit.testing.v1 import AppTest
+
+    streamlit_seconds = time.perf_counter() - began
+    at = AppTest.from_file(os.path.join(APP_DIR, 'main.py'), default_timeout=timeout)
+    at.run()
+    from instrumentation import REGISTRY
+
+    timings = REGISTRY.snapshot()['timings']
+    print(json.dumps({
+        'streamlit_import': streamlit_seconds,
+        'first_widget': timings['first_widget']['max_seconds'],
+        'first_run': time.perf_counter() - began - streamlit_seconds,
+        'exceptions': [str(e.value) for e in at.exception]
+    }))
+
+
+def parse_importtime(stderr: str) -> list:
+    # [(name, depth, cumulative seconds)] in import order
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            rows.append((match.group(4), len(match.group(3)) // 2, int(match.group(2)) / 1e6))
+    return rows
+
+
+def sample(timeout: float) -> dict:
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--timeout', str(timeout)],
+                          capture_output=True, text=True, cwd=ROOT)
+    result = next((json.loads(line) for line in proc.stdout.splitlines() if line.startswith('{')), None)
+    if result is None:
+        sys.exit(f'sample failed:\n{proc.stderr[-2000:]}')
+    return result
+
+
+def import_sample() -> list:
+    # The imports main.py makes before its first widget, in a single-threaded interpreter
+    code = f'import sys; sys.path.insert(0, {APP_DIR!r}); import streamlit; import functions, layaout, preload'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, cwd=ROOT)
+    return parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters to sample')
+    parser.add_argument('--top', type=int, default=15, help='slowest top-level imports to list')
+    parser.add_argument('--timeout', type=float, default=600)
+    parser.add_argument('--out', help='also save the results to this JSON file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.timeout)
+        return
+
+    results = []
+    for _ in range(args.repeat):
+        result = sample(args.timeout)
+        if result['exceptions']:
+            print(f"app raised: {result['exceptions']}", file=sys.stderr)
+        results.append(result)
+    imports = import_sample()
+
+    summary = {key: statistics.median(r[key] for r in results) for key in ('streamlit_import', 'first_widget', 'first_run')}
+    print(f'{args.repeat} cold starts (median)')
+    print(f"  {'streamlit import':<22} {summary['streamlit_import']:.3f} s")
+    print(f"  {'time to first widget':<22} {summary['first_widget']:.3f} s  (top of main.py to the date pickers)")
+    print(f"  {'first run':<22} {summary['first_run']:.3f} s  (whole page)")
+
+    # Top-level imports and what they import directly, e.g. functions -> pandas
+    slowest = sorted((row for row in imports if row[1] <= 1), key=lambda row: -row[2])[:args.top]
+    print('\nslowest imports before the first widget')
+    for name, depth, seconds in slowest:
+        print(f"  {seconds:8.3f} s  {'  ' * depth}{name}")
+    watched = {name: seconds for name, _, seconds in imports if name in WATCHED}
+    print('\nwatched modules before the first widget (cumulative, wherever first imported)')
+    for name in WATCHED:
+        print(f"  {name:<30} {f'{watched[name]:.3f} s' if name in watched else 'not imported'}")
+
+    if args.out:
+        with open(args.out, 'w') as fh:
+            json.dump({'summary': summary, 'samples': results, 'imports': watched}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
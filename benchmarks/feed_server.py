@@ -0,0 +1,67 @@
+"""Stand-in for a live traffic feed: serves synthetic days after a date as CSV.
+
+GET /?site=<site>&since=<YYYY-MM-DD> returns the days after `since` in the export format, up to
+a clock that starts at --start and moves one day ahead every --seconds-per-day of real time. Each
+site's days come from one series seeded by the site name, so every poll agrees on past days.
+
+    python benchmarks/feed_server.py --port 8765 --start 2020-08-19 --seconds-per-day 10
+    LIVE_FEED_URL=http://localhost:8765/ LIVE_POLL_SECONDS=5 streamlit run app/main.py
+"""
+import argparse
+import functools
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from synthetic import generate_site
+
+# Days the feed can serve before and after the start of its clock
+HISTORY_DAYS = 5 * 365
+FUTURE_DAYS = 30 * 365
+
+
+@functools.lru_cache(maxsize=64)
+def site_days(site: str, start) -> pd.DataFrame:
+    # Every day the feed can serve for `site`, generated once from a seed of the site alone
+    start = pd.Timestamp(start)
+    df = generate_site(HISTORY_DAYS + FUTURE_DAYS + 1, seed=zlib.crc32(site.encode()),
+                       end=start + pd.Timedelta(days=FUTURE_DAYS))
+    df.index = pd.date_range(end=start + pd.Timedelta(days=FUTURE_DAYS), periods=len(df))
+    return df
+
+
+def feed_rows(site: str, since, today, start) -> bytes:
+    # Days after `since` up to `today`; the same site and day always get the same counts
+    df = site_days(site, pd.Timestamp(start))
+    lo, hi = df.index.searchsorted([pd.Timestamp(since), pd.Timestamp(today)], side='right')
+    return df.iloc[lo:hi].to_csv(index=False).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--start', default='2020-08-19', help='feed clock at start-up')
+    parser.add_argument('--seconds-per-day', type=float, default=10.0)
+    args = parser.parse_args()
+    start, began = pd.Timestamp(args.start), time.monotonic()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            today = start + pd.Timedelta(days=int((time.monotonic() - began) // args.seconds_per_day))
+            body = feed_rows(query.get('site', ['site'])[0], query.get('since', [args.start])[0], today, start)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    print(f'Serving synthetic days from {start.date()} on http://localhost:{args.port}/')
+    ThreadingHTTPServer(('127.0.0.1', args.port), Handler).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Time every pipeline stage on synthetic traffic and save the results as JSON.
+
+Ingestion and cross-site totals run over all sites; the per-site stages (filtering, aggregations,
+correlograms, figures, ARIMA) run on the first site of each size. Hourly exports skip the stages
+built on the daily calendar frame (sites, calendar rollup, insights, heatmap).
+
+    python benchmarks/run_benchmarks.py --rows 2000 20000 --sites 1 10 --out bench.json
+    python benchmarks/run_benchmarks.py --rows 2000 20000 --compare bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'app'))
+
+import numpy as np
+import pandas as pd
+
+import datastore
+from datastore import COUNT_COLUMNS
+from forecasting import DEFAULT_ORDER, ForecastState, fit_arima
+from panels import (
+    acf_pacf_figure,
+    boxplot_figure,
+    compute_insights,
+    correlogram_frames,
+    heatmap_figure,
+    moving_average_figure,
+    violin_figure
+)
+from rendering import ResolutionPyramid
+from rolling import RollingStats
+from rollup import CalendarRollup
+from synthetic import write_sites
+
+# ARIMA stages fit at most this many trailing rows so large sizes stay practical
+ARIMA_MAX_ROWS = 5000
+# A stage counts as a regression when its median is this many times slower than the baseline
+REGRESSION_RATIO = 1.25
+# Stages that touch every site of a size; the rest work on the first site
+MULTI_SITE_STAGES = {'ingest.build_store', 'ingest.open_store', 'ingest.load_sites', 'agg.all_sites'}
+# Stages that need the daily calendar frame of load_sites(); hourly exports skip them
+DAILY_STAGES = {'ingest.load_sites', 'filter.site_view', 'agg.all_sites', 'agg.rollup_build', 'agg.rollup_query',
+                'agg.insights', 'figure.heatmap'}
+
+
+def _stages(ctx: dict) -> list:
+    # (name, callable) in pipeline order; ctx holds the inputs built for one size
+    data, window = ctx['data'], ctx['window']
+    start, end = window.index[0], window.index[-1]
+    arima_series = data['Unique_Visits'].iloc[-ARIMA_MAX_ROWS:]
+    return [
+        ('ingest.build_store', lambda: [datastore.build_store(path, ctx['store_dir']) for path in ctx['paths']]),
+        ('ingest.open_store', lambda: [datastore.load_store(path, ctx['store_dir']) for path in ctx['paths']]),
+        ('ingest.load_sites', lambda: datastore.load_sites(ctx['paths'], ctx['store_dir'])),
+        ('filter.site_view', lambda: datastore.site_view(ctx['sites'], ctx['site'])),
+        ('filter.searchsorted', lambda: datastore.select_date_range(data, start, end)),
+        ('filter.boolean_mask', lambda: data[(data['Date'] >= start) & (data['Date'] <= end)]),
+        ('agg.all_sites', lambda: datastore.site_view(ctx['sites'])),
+        ('agg.rollup_build', lambda: CalendarRollup(data)),
+        ('agg.rollup_query', lambda: (ctx['rollup'].cells('Unique_Visits', start, end),
+                                      ctx['rollup'].by_day('Unique_Visits', start, end),
+                                      ctx['rollup'].by_month('Unique_Visits', start, end))),
+        ('agg.pivot_table', lambda: window.pivot_table(index=window.index.dayofweek, columns=window.index.month,
+                                                       values='Unique_Visits', aggfunc='mean')),
+        ('agg.rolling_build', lambda: RollingStats(data)),
+        ('agg.pyramid_build', lambda: ResolutionPyramid(data, COUNT_COLUMNS)),
+        ('agg.insights', lambda: compute_insights(window, ctx['rollup'], ctx['rolling'])),
+        ('corr.nlags_30', lambda: correlogram_frames(window, 30)),
+        ('corr.nlags_365', lambda: correlogram_frames(window, 365)),
+        ('figure.heatmap', lambda: heatmap_figure(window, ctx['rollup'])),
+        ('figure.boxplot', lambda: boxplot_figure(window)),
+        ('figure.acf_pacf', lambda: acf_pacf_figure(ctx['corr'])),
+        ('figure.violin', lambda: violin_figure(window)),
+        ('figure.moving_average', lambda: moving_average_figure(window, ctx['rolling'], ctx['pyramid'])),
+        ('arima.fit', lambda: fit_arima(arima_series.iloc[:-7], DEFAULT_ORDER)),
+        ('arima.update', lambda: ctx['arima_state'].extend(arima_series, refit_every=0)),
+    ]
+
+
+def _prepare(paths: list, store_dir: str, freq: str = 'daily') -> dict:
+    if freq == 'daily':
+        sites = datastore.load_sites(paths, store_dir)
+        site = sites['Site'].cat.categories[0]
+        data = datastore.site_view(sites, site)
+    else:
+        # The compact frame holds whole days; hourly rows are read from the store as they are
+        sites, site = None, None
+        data = datastore.load_store(paths[0], store_dir)
+        data.index = pd.DatetimeIndex(data['Date'].values)
+    # Filter and query the middle half of the history, a typical dashboard selection
+    window = datastore.select_date_range(data, data.index[len(data) // 4], data.index[3 * len(data) // 4])
+    arima_history = data['Unique_Visits'].iloc[-ARIMA_MAX_ROWS:].iloc[:-7]
+    return {
+        'paths': paths,
+        'store_dir': store_dir,
+        'sites': sites,
+        'site': site,
+        'data': data,
+        'window': window,
+        'rollup': CalendarRollup(data) if freq == 'daily' else None,
+        'rolling': RollingStats(data),
+        'pyramid': ResolutionPyramid(data, COUNT_COLUMNS),
+        'corr': correlogram_frames(window, 30),
+        'arima_state': ForecastState(fit_arima(arima_history, DEFAULT_ORDER), arima_history, DEFAULT_ORDER)
+    }
+
+
+def _time(func, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - began)
+    return timings
+
+
+def _metadata() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(results: list, baseline_path: str, ratio: float = REGRESSION_RATIO) -> list:
+    # Stages whose median got slower than `ratio` times the baseline's median
+    with open(baseline_path) as fh:
+        baseline = {(r['stage'], r['rows'], r['sites'], r['freq']): r for r in json.load(fh)['results']}
+    regressions = []
+    print(f"\n{'stage':<24} {'rows':>8} {'sites':>5} {'baseline (s)':>13} {'now (s)':>10} {'ratio':>7}")
+    for result in results:
+        old = baseline.get((result['stage'], result['rows'], result['sites'], result['freq']))
+        if old is None:
+            continue
+        change = result['median_s'] / old['median_s'] if old['median_s'] else float('inf')
+        flag = '  REGRESSION' if change > ratio else ''
+        print(f"{result['stage']:<24} {result['rows']:>8} {result['sites']:>5} {old['median_s']:>13.5f} "
+              f"{result['median_s']:>10.5f} {change:>6.2f}x{flag}")
+        if flag:
+            regressions.append(result['stage'])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[2_000, 20_000], help='rows per site')
+    parser.add_argument('--sites', type=int, nargs='+', default=[1], help='sites per size')
+    parser.add_argument('--freq', choices=['daily', 'hourly'], default='daily')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--stage', action='append', help='only run stages starting with this prefix')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'wte-bench'),
+                        help='where synthetic exports are generated and reused')
+    parser.add_argument('--out', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_RATIO)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    results = []
+    print(f"{'stage':<24} {'rows':>8} {'sites':>5} {'min (s)':>10} {'median (s)':>11}")
+    for sites in args.sites:
+        for rows in args.rows:
+            paths = write_sites(args.data_dir, rows, sites, args.freq)
+            store_dir = os.path.join(args.data_dir, '.store')
+            ctx = _prepare(paths, store_dir, args.freq)
+            for name, func in _stages(ctx):
+                if args.stage and not any(name.startswith(prefix) for prefix in args.stage):
+                    continue
+                if args.freq != 'daily' and name in DAILY_STAGES:
+                    continue
+                timings = _time(func, args.repeat)
+                results.append({
+                    'stage': name,
+                    'rows': rows,
+                    'sites': sites,
+                    'freq': args.freq,
+                    'total_rows': rows * sites if name in MULTI_SITE_STAGES else rows,
+                    'repeat': args.repeat,
+                    'min_s': min(timings),
+                    'median_s': statistics.median(timings),
+                    'mean_s': statistics.fmean(timings)
+                })
+                print(f'{name:<24} {rows:>8} {sites:>5} {min(timings):>10.5f} {statistics.median(timings):>11.5f}')
+
+    if args.out:
+        with open(args.out, 'w') as fh:
+            json.dump({'meta': _metadata(), 'results': results}, fh, indent=2)
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Generate synthetic traffic exports with the schema of dataset/daily-website-visitors.csv.
+
+Counts follow a trend, a weekly cycle (busy weekdays, quiet weekends), a yearly
+cycle (summer and end-of-year dips) and noise, and are written comma-formatted
+("2,146") like the real export. Each site gets its own CSV file.
+
+    python benchmarks/synthetic.py --rows 100000 --sites 3 --out /tmp/traffic
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+HEADER = ['Row', 'Day', 'Day.Of.Week', 'Date', 'Page.Loads', 'Unique.Visits', 'First.Time.Visits', 'Returning.Visits']
+# Relative traffic Monday..Sunday
+WEEKLY_PROFILE = np.array([1.15, 1.2, 1.15, 1.05, 0.9, 0.65, 0.75])
+# Relative traffic by hour of day for hourly exports
+HOURLY_PROFILE = 0.4 + 0.6 * np.sin(np.linspace(0, np.pi, 24)) ** 2
+# Series end on the last day of the real export and extend back in time
+END = pd.Timestamp('2020-08-19')
+ROWS_PER_WRITE = 200_000
+
+
+def _format_counts(values) -> np.ndarray:
+    # 2146 -> "2,146" one group of three digits at a time, vectorized over the column
+    values = np.asarray(values, dtype=np.int64)
+    rest = values // 1000
+    low = (values % 1000).astype('U3')
+    text = np.where(rest > 0, np.char.zfill(low, 3), low).astype('U32')
+    while (rest > 0).any():
+        group = (rest % 1000).astype('U3')
+        group = np.where(rest // 1000 > 0, np.char.zfill(group, 3), group)
+        text = np.where(rest > 0, np.char.add(np.char.add(group, ','), text), text)
+        rest = rest // 1000
+    return text
+
+
+def generate_site(rows: int, seed: int = 0, freq: str = 'daily', end=END) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    step = pd.Timedelta(hours=1) if freq == 'hourly' else pd.Timedelta(days=1)
+    if (pd.Timestamp(end).value - pd.Timestamp.min.value) // step.value < rows - 1:
+        raise ValueError(f'{rows} {freq} rows do not fit in the datetime range; use more sites instead')
+    dates = pd.date_range(end=end, periods=rows, freq=step)
+    days_elapsed = (dates - dates[0]) / pd.Timedelta(days=1)
+    day_of_year = dates.dayofyear.values
+
+    level = rng.uniform(1500, 4000) * (24 if freq == 'daily' else 1) / 24
+    trend = 1 + rng.uniform(-0.05, 0.15) * days_elapsed / 365
+    yearly = 1 - 0.25 * np.exp(-((day_of_year - 205) / 25.0) ** 2) - 0.35 * np.exp(-((day_of_year - 358) / 6.0) ** 2)
+    weekly = WEEKLY_PROFILE[dates.dayofweek.values]
+    hourly = HOURLY_PROFILE[dates.hour.values] if freq == 'hourly' else 1.0
+    expected = level * np.maximum(trend, 0.2) * yearly * weekly * hourly
+    unique = np.maximum(rng.poisson(expected * rng.lognormal(0, 0.08, rows)), 1)
+    first_time = rng.binomial(unique, rng.uniform(0.8, 0.9))
+    page_loads = unique + rng.poisson(unique * rng.uniform(0.3, 0.5))
+
+    date_format = '%-m/%-d/%Y %H:%M' if freq == 'hourly' else '%-m/%-d/%Y'
+    columns = [
+        np.arange(1, rows + 1),
+        dates.day_name(),
+        # Sunday is day 1 in the original export
+        (dates.dayofweek.values + 1) % 7 + 1,
+        dates.strftime(date_format),
+        _format_counts(page_loads),
+        _format_counts(unique),
+        _format_counts(first_time),
+        _format_counts(unique - first_time)
+    ]
+    return pd.DataFrame(dict(zip(HEADER, columns)))
+
+
+def write_sites(out_dir: str, rows: int, sites: int = 1, freq: str = 'daily', seed: int = 0) -> list:
+    # One CSV per site; existing files with the same parameters are reused
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for site in range(sites):
+        path = os.path.join(out_dir, f'site_{site:03d}_{freq}_{rows}.csv')
+        if not os.path.exists(path):
+            tmp_path = path + '.tmp'
+            df = generate_site(rows, seed + site, freq)
+            for i in range(0, rows, ROWS_PER_WRITE):
+                df.iloc[i:i + ROWS_PER_WRITE].to_csv(tmp_path, mode='a' if i else 'w', header=not i, index=False)
+            os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000, help='rows per site; larger sizes are reached with more sites')
+    parser.add_argument('--sites', type=int, default=1)
+    parser.add_argument('--freq', choices=['daily', 'hourly'], default='daily')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='synthetic')
+    args = parser.parse_args()
+    for path in write_sites(args.out, args.rows, args.sites, args.freq, args.seed):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
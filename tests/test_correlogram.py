@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from statsmodels.tsa.stattools import acf, pacf_yw
+
+from correlogram import correlogram
+
+ROWS = 120
+
+
+def _series() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    days = np.arange(ROWS)
+    return np.vstack([
+        rng.normal(size=ROWS).cumsum(),
+        100 + 10 * np.sin(days * 2 * np.pi / 7) + rng.normal(size=ROWS),
+        np.full(ROWS, 3.0)
+    ])
+
+
+@pytest.mark.filterwarnings('ignore')
+@pytest.mark.parametrize('nlags', [1, 30, ROWS // 2, ROWS - 1])
+def test_correlogram_matches_statsmodels(nlags):
+    # pacf_yw with method='mle' is pacf(method='ywm') without its nlags < nobs // 2 limit
+    values = _series()
+    got_acf, got_pacf = correlogram(values, nlags)
+    np.testing.assert_allclose(got_acf, [acf(row, nlags=nlags, fft=False) for row in values], atol=1e-10)
+    np.testing.assert_allclose(got_pacf, [pacf_yw(row, nlags, method='mle') for row in values], atol=1e-8)
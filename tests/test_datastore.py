@@ -0,0 +1,49 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datastore import COUNT_COLUMNS, calendar_frame, iter_csv_chunks
+
+
+def _frame():
+    days = np.arange(18_000, 18_010, dtype=np.int32)
+    return calendar_frame(days, {col: np.arange(10, dtype=np.int32) for col in COUNT_COLUMNS})
+
+
+def test_calendar_frame_values_are_read_only():
+    data = _frame()
+    with pytest.raises(ValueError, match='read-only'):
+        data.iloc[0, data.columns.get_loc('Unique_Visits')] = 7
+    with pytest.raises(ValueError, match='read-only'):
+        data['Unique_Visits'].to_numpy()[0] = 7
+
+
+def test_shallow_copies_keep_added_columns_to_themselves():
+    # The protection covers the values, not the frame object; load_data hands each caller a copy
+    data = _frame()
+    session = data.copy(deep=False)
+    session['Ratio'] = session['Returning_Visits'] / session['Unique_Visits']
+    session['Unique_Visits'] = 0
+    assert 'Ratio' not in data.columns
+    assert data['Unique_Visits'].iloc[-1] == 9
+    assert not session['Page_Loads'].to_numpy().flags.writeable
+
+
+def test_csv_dates_may_mix_days_and_times_of_day():
+    body = (b'Row,Day,Day.Of.Week,Date,Page.Loads,Unique.Visits,First.Time.Visits,Returning.Visits\n'
+            b'1,Sunday,1,9/14/2014,"2,146","1,582","1,430",152\n'
+            b'2,Monday,2,9/15/2014,"3,621","2,528","2,297",231\n'
+            b'3,Monday,2,9/15/2014 13:00,"3,698","2,630","2,352",278\n')
+    chunks = list(iter_csv_chunks(io.BytesIO(body), chunksize=2))
+    dates = pd.concat(chunks)['Date']
+    assert list(dates) == [pd.Timestamp('2014-09-14'), pd.Timestamp('2014-09-15'), pd.Timestamp('2014-09-15 13:00')]
+    assert chunks[0]['Page_Loads'].iloc[0] == 2146
+
+
+def test_csv_dates_in_another_layout_are_reported():
+    body = (b'Row,Day,Day.Of.Week,Date,Page.Loads,Unique.Visits,First.Time.Visits,Returning.Visits\n'
+            b'1,Sunday,1,2014-09-14,"2,146","1,582","1,430",152\n')
+    with pytest.raises(ValueError, match="Unrecognized date '2014-09-14'"):
+        list(iter_csv_chunks(io.BytesIO(body)))
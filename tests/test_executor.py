@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from executor import ForecastExecutor
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.fixture
+def executor():
+    executor = ForecastExecutor(max_workers=2, timeout=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_a_job_past_its_deadline_leaves_the_other_jobs_running(executor):
+    slow = executor.submit(_sleep, 30)
+    other = executor.submit(_sleep, 0.5)
+    pool = executor.pool
+    began = time.monotonic()
+    with pytest.raises(FutureTimeoutError):
+        executor.result(slow)
+    # The worker stopped the job at its deadline; nothing was killed
+    assert time.monotonic() - began < 3
+    assert executor.result(other) == 0.5
+    assert executor.result(executor.submit(_sleep, 0)) == 0
+    assert executor.pool is pool
+
+
+def test_jobs_on_a_killed_pool_are_run_again(executor):
+    stored = []
+    future = executor.submit(_sleep, 0.5)
+    executor.on_result(future, stored.append)
+    # What happens to the pool of a job stuck past its deadline
+    executor._retire(executor.pool, kill=True)
+    assert executor.result(future) == 0.5
+    assert stored == [0.5]
+    assert executor.jobs == 2
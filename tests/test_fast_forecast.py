@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+
+from fast_forecast import ENGINES, rolling_forecasts
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_rolling_forecasts_match_a_refit_at_every_origin(engine):
+    rng = np.random.default_rng(0)
+    days = np.arange(600)
+    values = 1000 + np.cumsum(rng.normal(0, 5, len(days))) + 100 * np.sin(days * 2 * np.pi / 7)
+    # Origins too short for the engine's own state are included too
+    positions = np.concatenate([[3, 10, 29, 30, 31], np.arange(300, 571, 7)])
+    expected = np.array([ENGINES[engine](values[:origin], 30)[:, 0] for origin in positions])
+    np.testing.assert_allclose(rolling_forecasts(values, positions, 30, engine), expected, rtol=1e-9)
@@ -0,0 +1,37 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from forecasting import ForecastModelCache
+
+ORDER = (1, 1, 0)
+
+
+def _series(rows: int) -> pd.Series:
+    rng = np.random.default_rng(0)
+    return pd.Series(1000 + rng.normal(0, 20, rows).cumsum(), index=pd.date_range('2020-01-01', periods=rows))
+
+
+def test_live_lookup_leaves_due_refits_to_the_caller():
+    warnings.filterwarnings('ignore')
+    ts = _series(130)
+    cache = ForecastModelCache(refit_every=10)
+    cache.get_state('Unique_Visits', ts.iloc[:120], ORDER)
+    # A few new days are filtered into the fitted state...
+    updated = cache.lookup('Unique_Visits', ts.iloc[:125], ORDER, live=True)
+    assert updated is not None and updated.appended == 5
+    # ...but once a refit is due the lookup misses, so it is fitted like any other
+    assert cache.lookup('Unique_Visits', ts, ORDER, live=True) is None
+    assert cache.lookup('Unique_Visits', ts.iloc[:125], ORDER) is None
+
+
+def test_eviction_also_forgets_the_newest_state_index():
+    warnings.filterwarnings('ignore')
+    ts = _series(200)
+    cache = ForecastModelCache(maxsize=2)
+    # Every start date gets its own entry in the index of newest states
+    for start in range(0, 50, 10):
+        cache.get_state('Unique_Visits', ts.iloc[start:start + 120], ORDER)
+    assert len(cache) == 2
+    assert len(cache._latest) == 2
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomalies import AnomalyTrack
+from datastore import COUNT_COLUMNS, calendar_frame
+from rendering import ResolutionPyramid
+from rolling import RollingStats
+from rollup import CalendarRollup
+from table import TableIndex
+
+# Structure built from a calendar frame, and what its readers see of it
+STRUCTURES = {
+    'rollup': (CalendarRollup, lambda rollup, data: rollup.sums('Unique_Visits', data.index[0], data.index[-1])),
+    'rolling': (RollingStats, lambda rolling, data: [rolling.get(metric, 28, stat) for metric in COUNT_COLUMNS
+                                                      for stat in ('mean', 'std', 'min', 'max')]),
+    'pyramid': (lambda data: ResolutionPyramid(data, COUNT_COLUMNS), lambda pyramid, data: list(pyramid.levels.values())),
+    'table': (TableIndex, lambda table, data: [table.rows(data, sort_by=col) for col in ('Date', 'Day', 'Month', 'Page_Loads')]),
+    'anomalies': (AnomalyTrack, lambda track, data: [track.expected, track.z])
+}
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    days = np.arange(18_000, 18_000 + rows, dtype=np.int32)
+    return calendar_frame(days, {col: rng.integers(500, 5000, rows).astype(np.int32) for col in COUNT_COLUMNS})
+
+
+@pytest.mark.parametrize('name', sorted(STRUCTURES))
+@pytest.mark.parametrize('added', [1, 40])
+def test_extended_matches_a_full_rebuild(name, added):
+    build, read = STRUCTURES[name]
+    data = _frame(400)
+    extended = build(data.iloc[:-added]).extended(data)
+    for got, expected in zip(read(extended, data), read(build(data), data)):
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(got, expected)
+        elif isinstance(expected, pd.Series):
+            pd.testing.assert_series_equal(got, expected)
+        else:
+            np.testing.assert_allclose(got, expected)
@@ -0,0 +1,15 @@
+from instrumentation import Metrics, NAMESPACE
+
+
+def test_label_values_are_escaped_in_the_text_format():
+    metrics = Metrics()
+    stage = 'panel "Daily"\nC:\\export'
+    metrics.observe(stage, 0.5)
+    metrics.count('exports', site='a"b')
+    metrics.register('cache', lambda: {'hit\n': 1})
+    lines = metrics.to_prometheus().splitlines()
+    assert f'{NAMESPACE}_stage_seconds_count{{stage="panel \\"Daily\\"\\nC:\\\\export"}} 1' in lines
+    assert f'{NAMESPACE}_exports_total{{site="a\\"b"}} 1' in lines
+    assert f'{NAMESPACE}_cache{{counter="hit\\n"}} 1' in lines
+    # Every sample stays on one line of its own
+    assert len([line for line in lines if line.startswith(f'{NAMESPACE}_stage_seconds')]) == 3
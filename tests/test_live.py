@@ -0,0 +1,42 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from live import HttpFeed
+
+HEADER = b'Row,Day,Day.Of.Week,Date,Page.Loads,Unique.Visits,First.Time.Visits,Returning.Visits\n'
+
+
+@pytest.fixture
+def feed_url():
+    # Local feed that answers every poll with `body`, like a feed with no new days
+    class Handler(BaseHTTPRequestHandler):
+        body = HEADER
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv')
+            self.end_headers()
+            self.wfile.write(self.body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/', Handler
+    server.shutdown()
+
+
+def test_http_feed_without_new_days(feed_url):
+    url, _ = feed_url
+    assert HttpFeed(url, 'shop').poll('2020-08-19') is None
+
+
+def test_http_feed_rows(feed_url):
+    url, handler = feed_url
+    handler.body = HEADER + b'1,Thursday,5,8/20/2020,"2,146",1582,1430,152\n'
+    rows = HttpFeed(url, 'shop').poll('2020-08-19')
+    assert list(rows['Page_Loads']) == [2146]
+    assert str(rows['Date'].iloc[0].date()) == '2020-08-20'